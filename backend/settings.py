@@ -24,6 +24,29 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Dir export
 EXPORT_DIR = os.path.join(BASE_DIR, 'exports')
 
+# Сколько предложений читается из базы и пишется в файл экспорта за раз
+EXPORT_CHUNK_SIZE = 2000
+
+# Перекрытие окна инкрементального экспорта, с: покрывает транзакции, зафиксированные после метки
+EXPORT_DELTA_OVERLAP = 60
+
+# Сколько последних полных экспортов каждого формата хранить вместе с их инкрементальными
+EXPORT_KEEP_FULL = 5
+
+# Максимальное время, на которое одинаковые запросы экспорта объединяются в одну задачу, с
+EXPORT_LOCK_TIMEOUT = 60 * 60
+
+# Dir для загруженных прайсов, ожидающих импорта
+IMPORT_UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+
+# Размер пакета записи при импорте товаров
+IMPORT_BATCH_SIZE = 1000
+
+# Прайсы от этого размера (в байтах) делятся на шарды по IMPORT_SHARD_SIZE строк
+# и импортируются параллельно на нескольких воркерах
+IMPORT_SHARD_THRESHOLD = 20 * 1024 * 1024
+IMPORT_SHARD_SIZE = 50000
+
 # Создаём экземпляр Env
 env = environ.Env(
     DEBUG=(bool, False),
@@ -144,6 +167,7 @@ TEST_RUNNER = 'django.test.runner.DiscoverRunner'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'service.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -233,11 +257,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Settings for REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'service.renderers.ORJSONRenderer',
+        # Browsable API нужен только при разработке
+        *(('rest_framework.renderers.BrowsableAPIRenderer',) if DEBUG else ()),
     ),
     'DEFAULT_PARSER_CLASSES': (
-        'rest_framework.parsers.JSONParser',  # Парсер для обработки JSON-запросов
+        'service.renderers.ORJSONParser',  # Парсер для обработки JSON-запросов
         'rest_framework.parsers.FormParser',  # Парсер для обработки форм (application/x-www-form-urlencoded)
         'rest_framework.parsers.MultiPartParser',  # Парсер для обработки файлов и mixed-content (multipart/form-data)
     ),
@@ -277,6 +302,40 @@ VERSATILEIMAGEFIELD_SETTINGS = {
     'create_images_on_demand': True,  # изображение
 }
 
+# Наборы размеров изображений. Размеры товаров создаются заранее задачей после сохранения,
+# а не при первом запросе каталога
+VERSATILEIMAGEFIELD_RENDITION_KEY_SETS = {
+    'image_sizes': [
+        ('full_size', 'url'),
+        ('medium', 'crop__400x400'),
+        ('small', 'thumbnail__100x100'),
+    ],
+}
+
+# Размер страницы каталога по умолчанию и максимальный, задаваемый параметром page_size
+CATALOG_PAGE_SIZE = 50
+CATALOG_MAX_PAGE_SIZE = 200
+
+# Границы ценовых диапазонов фасетов каталога; последний диапазон открыт сверху
+CATALOG_PRICE_BANDS = [0, 1000, 5000, 10000, 50000, 100000]
+
+# Время хранения закешированных ответов каталога, с; 0 отключает кеш.
+# Устаревшие ответы не используются и раньше: ключ включает версию каталога
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+# Наибольшее число товаров в одном запросе сравнения предложений
+PRODUCT_OFFERS_MAX_IDS = 100
+
+# Сжатие ответов: минимальный размер в байтах и уровни gzip и brotli
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Превышение бюджета SQL-запросов вида приводит к ошибке, а не только к записи в лог.
+# По умолчанию выключено, чтобы перерасход не превращал рабочий запрос в ошибку 500;
+# тесты бюджета включают его через override_settings
+QUERY_BUDGET_STRICT = env.bool('QUERY_BUDGET_STRICT', default=False)
+
 
 # Секретный ключ для JWT
 JWT_SIGNING_KEY = env('JWT_SIGNING_KEY')
@@ -311,7 +370,8 @@ CACHES = {
 CACHALOT_ENABLED = True
 
 # Специальные исключения
-# CACHALOT_UNCACHEABLE_TABLES = []
+# Прогресс импорта обновляется каждым пакетом, кешировать его нет смысла
+CACHALOT_UNCACHEABLE_TABLES = frozenset(('django_migrations', 'service_importjob'))
 # CACHALOT_TIMEOUT = None  # По умолчанию 86400 секунд (сутки)
 
 # Конфигурация Baton
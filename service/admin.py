@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, Shop, Product, ProductInfo, Order, OrderItem, Contact, Cart, CartItem
+from .models import CustomUser, Shop, Product, ProductInfo, Order, OrderItem, Contact, Cart, CartItem, ImportJob, ProductExport
 
 # Класс администрирования для пользователя
 @admin.register(CustomUser)
@@ -68,4 +68,20 @@ class CartItemAdmin(admin.ModelAdmin):
 
     def cart_safe(self, obj):
         return obj.cart if obj.cart else '(Без корзины)'
-    cart_safe.short_description = 'Корзина'
\ No newline at end of file
+    cart_safe.short_description = 'Корзина'
+
+
+# Класс администрирования для импорта прайсов
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'file_name', 'status', 'rows_processed', 'rows_total', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('user__email', 'file_name', 'task_id')
+
+
+# Класс администрирования для экспортов каталога
+@admin.register(ProductExport)
+class ProductExportAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'kind', 'format', 'rows', 'size', 'high_water_mark')
+    list_filter = ('kind', 'format')
+    search_fields = ('filename', 'checksum')
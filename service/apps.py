@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate, post_migrate
 
 
 class ServiceConfig(AppConfig):
@@ -7,6 +8,9 @@ class ServiceConfig(AppConfig):
 
     def ready(self):
         """
-        Загружает сигналы при старте приложения.
+        Загружает сигналы при старте приложения и подключает обслуживание триггеров поиска при миграциях.
         """
-        from . import signals
\ No newline at end of file
+        from . import signals
+        from .search import suspend_search_triggers, restore_search_triggers
+        pre_migrate.connect(suspend_search_triggers, sender=self)
+        post_migrate.connect(restore_search_triggers, sender=self)
\ No newline at end of file
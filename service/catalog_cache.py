@@ -0,0 +1,75 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'catalog:version'
+# Область списков без отбора по категории: в них попадают товары всех категорий
+LIST_SCOPE = 'list'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+def _version_key(scope):
+    return CATALOG_VERSION_KEY if scope is None else f'{CATALOG_VERSION_KEY}:{scope}'
+
+
+def catalog_version(scope=None):
+    """
+    Текущая версия каталога - время последнего изменения в наносекундах.
+    Хранится в общем кеше, поэтому одинакова для всех процессов.
+    Версия области scope (категории, товара или списков) меняется только при изменениях в ней.
+    """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def catalog_versions(scopes):
+    """
+    Версии каталога и областей scopes одним обращением к кешу.
+    """
+    scopes = [None, *scopes]
+    found = cache.get_many([_version_key(scope) for scope in scopes])
+    return [found.get(_version_key(scope)) or catalog_version(scope) for scope in scopes]
+
+
+def bump_catalog_version(categories=None, products=None):
+    """
+    Меняет версию каталога после фиксации текущей транзакции.
+    Закешированные ответы прежней версии перестают использоваться.
+    Если заданы категории или товары, меняются только их версии и версия списков без отбора:
+    ответы по другим категориям и товарам остаются в кеше.
+    """
+    if categories is None and products is None:
+        scopes = [None]
+    else:
+        scopes = [LIST_SCOPE, *map(category_scope, set(categories or ())), *map(product_scope, set(products or ()))]
+    transaction.on_commit(lambda: _bump_catalog_version(scopes))
+
+
+def _bump_catalog_version(scopes=(None,)):
+    keys = [_version_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    now = time.time_ns()
+    cache.set_many({key: max(now, (current.get(key) or 0) + 1) for key in keys}, None)
+
+
+def catalog_cache_key(request, versions):
+    """
+    Ключ закешированного ответа: версии каталога и областей ответа, путь и нормализованные параметры запроса.
+    """
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.blake2b(f'{request.path}?{params}'.encode('utf-8'), digest_size=16).hexdigest()
+    return f"catalog:response:{'-'.join(map(str, versions))}:{digest}"
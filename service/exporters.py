@@ -0,0 +1,286 @@
+import csv
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import yaml
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from .importers import chunked
+from .uploads import CHUNK_SIZE
+from .models import Product, ProductInfo, DeletedOffer, ProductExport
+
+try:
+    # Эмиттер на libyaml заметно быстрее, используем его при наличии
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+EXPORT_FIELDS = ('id', 'name', 'model', 'price', 'quantity', 'shop', 'category')
+# Строки инкрементального экспорта дополнительно помечают удалённые предложения
+DELTA_FIELDS = (*EXPORT_FIELDS, 'deleted')
+EXPORT_VALUES = ('product_id', 'product__name', 'model', 'price', 'quantity', 'shop__name', 'product__category__name')
+
+
+def catalog_version():
+    """
+    Версия каталога. Меняется при добавлении, изменении и удалении предложений и товаров,
+    поэтому одинаковая версия означает одинаковое содержимое экспорта.
+    Переименование категории или магазина сдвигает метку изменения их предложений (см. signals).
+    """
+    offers = ProductInfo.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    products = Product.objects.aggregate(updated=Max('updated_at'))
+    deleted = DeletedOffer.objects.aggregate(last=Max('id'))
+    payload = f"{offers['count']}|{offers['updated']}|{products['updated']}|{deleted['last']}"
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def export_lock_key(export_format, kind):
+    """
+    Ключ кеша, под которым хранится id выполняющейся задачи экспорта.
+    """
+    return f'export-lock:{export_format}:{kind}'
+
+
+def iter_export_rows(queryset=None, chunk_size=None):
+    """
+    Потоково выбирает предложения для экспорта, не загружая весь каталог в память.
+    """
+    queryset = ProductInfo.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('id').values_list(*EXPORT_VALUES).iterator(
+        chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE
+    )
+    for product_id, name, model, price, quantity, shop, category in rows:
+        yield {
+            'id': product_id,
+            'name': name,
+            'model': model,
+            'price': float(price),
+            'quantity': quantity,
+            'shop': shop,
+            'category': category,
+        }
+
+
+def iter_delta_rows(since, chunk_size=None):
+    """
+    Выбирает предложения, добавленные, изменённые или удалённые после метки since.
+    Удаления идут первыми, чтобы последующее повторное добавление того же предложения не потерялось.
+    Предложения переименованных категорий и магазинов попадают сюда по сдвинутой метке updated_at.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    tombstones = DeletedOffer.objects.filter(deleted_at__gt=since).order_by('id').values_list('product_id', 'shop')
+    for product_id, shop in tombstones.iterator(chunk_size=chunk_size):
+        yield {**dict.fromkeys(EXPORT_FIELDS), 'id': product_id, 'shop': shop, 'deleted': True}
+
+    changed = ProductInfo.objects.filter(Q(updated_at__gt=since) | Q(product__updated_at__gt=since))
+    for row in iter_export_rows(changed, chunk_size):
+        row['deleted'] = False
+        yield row
+
+
+class YamlExportWriter:
+    """
+    Пишет экспорт в YAML по частям: каждый пакет товаров дописывается в раздел goods.
+    Ключи верхнего уровня идут в том же порядке, что и при yaml.dump всего документа.
+    """
+
+    def __init__(self, path, fields):
+        self.stream = open(path, 'w', encoding='utf-8')
+        self.empty = True
+
+    def write(self, items):
+        if self.empty:
+            self.stream.write('categories: []\ngoods:\n')
+            self.empty = False
+        yaml.dump(items, self.stream, Dumper=SafeDumper, allow_unicode=True, default_flow_style=False)
+
+    def close(self):
+        if self.empty:
+            self.stream.write('categories: []\ngoods: []\n')
+        self.stream.write('shops: []\n')
+        self.stream.close()
+
+    def abort(self):
+        self.stream.close()
+
+
+class CsvGzipExportWriter:
+    """
+    Пишет экспорт в CSV с заголовком, сжатый gzip.
+    """
+
+    def __init__(self, path, fields):
+        self.stream = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.stream, fieldnames=fields)
+        self.writer.writeheader()
+
+    def write(self, items):
+        self.writer.writerows(items)
+
+    def close(self):
+        self.stream.close()
+
+    abort = close
+
+
+class JsonlExportWriter:
+    """
+    Пишет экспорт в JSON Lines: одно предложение на строку.
+    """
+
+    def __init__(self, path, fields):
+        self.stream = open(path, 'w', encoding='utf-8')
+
+    def write(self, items):
+        self.stream.writelines(json.dumps(item, ensure_ascii=False) + '\n' for item in items)
+
+    def close(self):
+        self.stream.close()
+
+    abort = close
+
+
+class ParquetExportWriter:
+    """
+    Пишет экспорт в Parquet: каждый пакет предложений становится группой строк файла.
+    """
+
+    def __init__(self, path, fields):
+        # pyarrow нужен только для этого формата, поэтому импортируется по требованию
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            'id': pa.int64(),
+            'name': pa.string(),
+            'model': pa.string(),
+            'price': pa.float64(),
+            'quantity': pa.int64(),
+            'shop': pa.string(),
+            'category': pa.string(),
+            'deleted': pa.bool_(),
+        }
+        self.pa = pa
+        self.schema = pa.schema([(field, types[field]) for field in fields])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='snappy')
+
+    def write(self, items):
+        self.writer.write_table(self.pa.Table.from_pylist(items, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+    abort = close
+
+
+# Формат экспорта: класс писателя и расширение файла
+EXPORT_FORMATS = {
+    'yaml': (YamlExportWriter, '.yaml'),
+    'csv.gz': (CsvGzipExportWriter, '.csv.gz'),
+    'jsonl': (JsonlExportWriter, '.jsonl'),
+    'parquet': (ParquetExportWriter, '.parquet'),
+}
+
+
+def export_products(path, export_format='yaml', rows=None, fields=EXPORT_FIELDS, chunk_size=None):
+    """
+    Экспортирует строки rows (по умолчанию весь каталог) в файл path в формате export_format
+    пакетами по chunk_size предложений.
+    Файл пишется во временный и переименовывается по готовности, поэтому недописанный экспорт не виден.
+    Возвращает число выгруженных строк.
+    """
+    writer_class = EXPORT_FORMATS[export_format][0]
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    if rows is None:
+        rows = iter_export_rows(chunk_size=chunk_size)
+    temp_path = f'{path}.part'
+    count = 0
+    try:
+        writer = writer_class(temp_path, fields)
+        try:
+            for chunk in chunked(rows, chunk_size):
+                writer.write(chunk)
+                count += len(chunk)
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return count
+
+
+def export_path(filename):
+    """
+    Абсолютный путь к файлу экспорта. Имя не может выйти за пределы каталога экспорта.
+    """
+    return os.path.join(settings.EXPORT_DIR, os.path.basename(filename))
+
+
+def iter_file_range(path, start, length, chunk_size=CHUNK_SIZE):
+    """
+    Читает length байт файла начиная с start порциями по chunk_size.
+    """
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        while length > 0:
+            chunk = stream.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def manifest_path(path):
+    """
+    Путь к манифесту, который лежит рядом с файлом экспорта.
+    """
+    return f'{path}.manifest.json'
+
+
+def write_manifest(path, manifest):
+    """
+    Сохраняет манифест экспорта в JSON.
+    """
+    with open(manifest_path(path), 'w', encoding='utf-8') as stream:
+        json.dump(manifest, stream, ensure_ascii=False, indent=2)
+
+
+def remove_export_files(export):
+    """
+    Удаляет файл экспорта и его манифест.
+    """
+    path = export_path(export.filename)
+    for name in (path, manifest_path(path)):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+def prune_exports(export_format, keep=None):
+    """
+    Оставляет keep последних полных экспортов формата вместе с их инкрементальными,
+    остальные удаляет с файлами. Записи об удалённых предложениях старше
+    самого раннего оставшегося экспорта больше не нужны и тоже удаляются.
+    Возвращает число удалённых экспортов.
+    """
+    keep = keep or settings.EXPORT_KEEP_FULL
+    full = ProductExport.objects.filter(format=export_format, kind='full')
+    stale = list(full[keep:])
+    if not stale:
+        return 0
+    removed = list(ProductExport.objects.filter(Q(pk__in=[export.pk for export in stale]) | Q(base__in=stale)))
+    for export in removed:
+        remove_export_files(export)
+    ProductExport.objects.filter(pk__in=[export.pk for export in removed]).delete()
+
+    oldest = ProductExport.objects.order_by('high_water_mark').values_list('high_water_mark', flat=True).first()
+    if oldest:
+        overlap = datetime.timedelta(seconds=settings.EXPORT_DELTA_OVERLAP)
+        DeletedOffer.objects.filter(deleted_at__lt=oldest - overlap).delete()
+    return len(removed)
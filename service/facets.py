@@ -0,0 +1,248 @@
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from .models import CatalogFacet, Product, ProductInfo
+from .catalog_cache import bump_catalog_version
+
+
+def price_band_expression():
+    """
+    Номер ценового диапазона минимальной цены товара по границам CATALOG_PRICE_BANDS.
+    """
+    bounds = settings.CATALOG_PRICE_BANDS
+    return Case(
+        *[When(min_price__lt=bound, then=Value(number)) for number, bound in enumerate(bounds[1:])],
+        default=Value(len(bounds) - 1),
+        output_field=IntegerField(),
+    )
+
+
+def price_band(min_price):
+    """
+    Номер ценового диапазона цены, как в price_band_expression.
+    """
+    bounds = settings.CATALOG_PRICE_BANDS
+    for number, bound in enumerate(bounds[1:]):
+        if min_price < bound:
+            return number
+    return len(bounds) - 1
+
+
+def apply_facet_deltas(deltas):
+    """
+    Изменяет счётчики фасетов на разницу deltas: {(измерение, категория, магазин, диапазон): изменение}.
+    Недостающие строки создаются, обнулившиеся удаляются.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    for (dimension, category_id, shop_id, band), delta in deltas.items():
+        key = {'dimension': dimension, 'category_id': category_id, 'shop_id': shop_id, 'band': band}
+        if not CatalogFacet.objects.filter(**key).update(count=Greatest(F('count') + delta, 0)) and delta > 0:
+            CatalogFacet.objects.create(count=delta, **key)
+    if deltas:
+        CatalogFacet.objects.filter(category_id__in={key[1] for key in deltas}, count=0).delete()
+
+
+def refresh_shop_facets(pairs):
+    """
+    Пересчитывает счётчики магазинов только для пар (категория, магазин).
+    """
+    if not pairs:
+        return
+    offers = ProductInfo.objects.active().filter(
+        product__category_id__in={category_id for category_id, _ in pairs},
+        shop_id__in={shop_id for _, shop_id in pairs},
+    )
+    counts = {
+        (row['product__category_id'], row['shop_id']): row['count']
+        for row in offers.values('product__category_id', 'shop_id').annotate(count=Count('id')).order_by()
+    }
+    condition = Q()
+    for category_id, shop_id in pairs:
+        condition |= Q(category_id=category_id, shop_id=shop_id)
+    CatalogFacet.objects.filter(condition, dimension='shop').delete()
+    CatalogFacet.objects.bulk_create([
+        CatalogFacet(dimension='shop', category_id=category_id, shop_id=shop_id, count=counts[category_id, shop_id])
+        for category_id, shop_id in pairs if counts.get((category_id, shop_id))
+    ])
+
+
+class CatalogRefresh:
+    """
+    Пересчёт сводки товаров и фасетов после изменения предложений.
+    Сводка пересчитывается только у затронутых товаров, счётчики категорий и цен меняются на разницу
+    между прежней и новой сводкой, а счётчики магазинов - только для затронутых пар категория-магазин.
+    Категории из categories (смена категории товара, удаление товара) пересчитываются целиком.
+    """
+
+    def __init__(self):
+        self.offers = set()  # Пары (товар, магазин) изменённых предложений
+        self.categories = set()
+        self.deleting = 0  # Число удаляемых объектов, каскад которых ещё не завершён
+        self.done = False
+
+    def __call__(self):
+        if self.done:
+            return
+        self.done = True
+        with transaction.atomic():
+            categories = self.refresh()
+        if categories is None:
+            bump_catalog_version()
+        else:
+            bump_catalog_version(categories=categories, products={product_id for product_id, _ in self.offers})
+
+    def refresh(self):
+        """
+        Пересчитывает сводку и фасеты. Возвращает затронутые категории или None, если изменились
+        счётчики категорий: они входят в ответ каталога по любой категории.
+        """
+        fields = ('id', 'category_id', 'offers_count', 'min_price')
+        # Блокировка товаров не даёт параллельному пересчёту учесть ту же разницу дважды
+        before = {
+            row['id']: row for row in Product.objects.select_for_update()
+            .filter(pk__in={product_id for product_id, _ in self.offers}).order_by('pk').values(*fields)
+        }
+        Product.refresh_aggregates(before)
+        deltas = Counter()
+        categories = {}
+        for row in Product.objects.filter(pk__in=before).values(*fields):
+            categories[row['id']] = row['category_id']
+            if row['category_id'] in self.categories:
+                continue
+            for sign, state in ((-1, before[row['id']]), (1, row)):
+                if state['offers_count']:
+                    deltas['category', state['category_id'], None, None] += sign
+                    deltas['price', state['category_id'], None, price_band(state['min_price'])] += sign
+        apply_facet_deltas(deltas)
+        refresh_shop_facets({
+            (categories[product_id], shop_id) for product_id, shop_id in self.offers
+            if product_id in categories and categories[product_id] not in self.categories
+        })
+        refresh_facets(self.categories)
+        if self.categories or any(key[0] == 'category' for key, delta in deltas.items() if delta):
+            return None
+        return {state['category_id'] for state in before.values()} | set(categories.values())
+
+
+def _pending_refresh():
+    """
+    Начатый и ещё не выполненный пакетный пересчёт текущей транзакции.
+    Пакет хранится в очереди on_commit соединения, поэтому при откате исчезает вместе с транзакцией.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    return next((func for _, func, _ in connection.run_on_commit
+                 if isinstance(func, CatalogRefresh) and not func.done), None)
+
+
+def start_catalog_batch():
+    """
+    Вызывается перед удалением магазина, категории или товара. Изменения предложений при каскадном
+    удалении копятся в пакете и пересчитываются один раз в finish_catalog_batch.
+    """
+    refresh = _pending_refresh()
+    if refresh is None:
+        if not transaction.get_connection().in_atomic_block:
+            return
+        refresh = CatalogRefresh()
+        # Пакет, не завершённый из-за ошибки удаления, выполнится при фиксации транзакции
+        transaction.on_commit(refresh)
+    refresh.deleting += 1
+
+
+def finish_catalog_batch(categories=()):
+    """
+    Вызывается после удаления объекта, начавшего пакет. Когда удалены все объекты пакета,
+    пересчитывает сводку и фасеты; categories пересчитываются целиком.
+    """
+    refresh = _pending_refresh()
+    if refresh is None:
+        schedule_catalog_refresh(categories=categories)
+        return
+    refresh.categories.update(category_id for category_id in categories if category_id is not None)
+    refresh.deleting -= 1
+    if refresh.deleting <= 0:
+        refresh()
+
+
+def schedule_catalog_refresh(offers=(), categories=()):
+    """
+    Пересчитывает сводку и фасеты для изменённых предложений offers (пары товар-магазин)
+    и категорий categories: сразу или в составе начатого пакета.
+    """
+    pending = _pending_refresh()
+    refresh = pending or CatalogRefresh()
+    refresh.offers.update(offers)
+    refresh.categories.update(category_id for category_id in categories if category_id is not None)
+    if pending is None:
+        refresh()
+
+
+def refresh_facets(category_ids):
+    """
+    Пересчитывает счётчики фасетов указанных категорий.
+    Каждая категория пересчитывается целиком, остальные не затрагиваются.
+    """
+    category_ids = {category_id for category_id in category_ids if category_id is not None}
+    if not category_ids:
+        return
+    facets = []
+    available = Product.objects.filter(category_id__in=category_ids, offers_count__gt=0)
+    for row in available.values('category_id').annotate(count=Count('id')).order_by():
+        facets.append(CatalogFacet(dimension='category', category_id=row['category_id'], count=row['count']))
+    offers = ProductInfo.objects.active().filter(product__category_id__in=category_ids)
+    for row in offers.values('product__category_id', 'shop_id').annotate(count=Count('id')).order_by():
+        facets.append(CatalogFacet(dimension='shop', category_id=row['product__category_id'],
+                                   shop_id=row['shop_id'], count=row['count']))
+    priced = available.annotate(band=price_band_expression())
+    for row in priced.values('category_id', 'band').annotate(count=Count('id')).order_by():
+        facets.append(CatalogFacet(dimension='price', category_id=row['category_id'],
+                                   band=row['band'], count=row['count']))
+
+    with transaction.atomic():
+        CatalogFacet.objects.filter(category_id__in=category_ids).delete()
+        CatalogFacet.objects.bulk_create(facets)
+
+
+def catalog_facets(category_id=None):
+    """
+    Возвращает счётчики по категориям, магазинам и ценовым диапазонам.
+    Если задана категория, счётчики магазинов и цен считаются в её пределах.
+    Отбор по категории и суммирование по магазинам и диапазонам выполняются в базе одним запросом,
+    поэтому ответ содержит по строке на категорию, магазин и диапазон.
+    """
+    rows = CatalogFacet.objects.annotate(
+        # Строки категорий группируются по категории, остальные - по магазину и диапазону
+        scope_id=Case(When(dimension='category', then=F('category_id'))),
+        scope_name=Case(When(dimension='category', then=F('category__name'))),
+    )
+    if category_id is not None:
+        rows = rows.filter(Q(dimension='category') | Q(category_id=category_id))
+    rows = rows.values('dimension', 'scope_id', 'scope_name', 'shop_id', 'shop__name', 'band') \
+        .annotate(total=Sum('count')).order_by()
+
+    categories, shops, bands = [], [], {}
+    for row in rows:
+        if row['dimension'] == 'category':
+            categories.append({'id': row['scope_id'], 'name': row['scope_name'], 'count': row['total']})
+        elif row['dimension'] == 'shop':
+            shops.append({'id': row['shop_id'], 'name': row['shop__name'], 'count': row['total']})
+        else:
+            bands[row['band']] = row['total']
+
+    bounds = settings.CATALOG_PRICE_BANDS
+    return {
+        'categories': sorted(categories, key=lambda item: item['name']),
+        'shops': sorted(shops, key=lambda item: item['name']),
+        'price': [
+            {
+                'from': bounds[band],
+                'to': bounds[band + 1] if band + 1 < len(bounds) else None,
+                'count': bands[band],
+            }
+            for band in sorted(bands)
+        ],
+    }
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from operator import itemgetter
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import empty
+from versatileimagefield.serializers import VersatileImageFieldSerializer
+
+# Поля моделей, значение которых из .values() уже совпадает с представлением в DRF
+SIMPLE_MODEL_FIELDS = (
+    models.AutoField, models.BigAutoField, models.SmallAutoField,
+    models.IntegerField, models.BigIntegerField, models.SmallIntegerField,
+    models.PositiveIntegerField, models.PositiveBigIntegerField, models.PositiveSmallIntegerField,
+    models.CharField, models.TextField, models.EmailField, models.BooleanField,
+)
+SIMPLE_SERIALIZER_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField,
+                            serializers.ChoiceField)
+# Размер пакета первичных ключей при выборке вложенных списков
+LIST_BATCH_SIZE = 500
+
+
+class NotCompilable(Exception):
+    """
+    Сериализатор содержит поля, которые нельзя построить по строкам .values().
+    """
+
+
+class CompiledSerializer:
+    """
+    Строит представление объектов по строкам .values() без экземпляров моделей и полей DRF.
+    Результат совпадает с исходным сериализатором, включая порядок ключей.
+    Вложенные объекты по внешнему ключу берутся из той же строки через соединение,
+    вложенные списки - одним дополнительным запросом на пакет строк.
+    Поддерживаются поля модели, первичные ключи связей, вложенные сериализаторы и изображения,
+    на остальных полях конструктор выбрасывает NotCompilable.
+    """
+
+    def __init__(self, serializer, prefix=''):
+        self.model = serializer.Meta.model
+        self.prefix = prefix
+        self.pk_column = prefix + self.model._meta.pk.name
+        self.columns = {self.pk_column}
+        self.getters = []
+        self.lists = []
+        for name, field in serializer.fields.items():
+            if not field.write_only:
+                self.compile_field(name, field)
+
+    def resolve(self, field):
+        """
+        Находит поле модели по source поля сериализатора и путь к нему для .values().
+        Возвращает None, если у модели нет такого атрибута: DRF такое поле пропускает.
+        """
+        if field.source == '*':
+            raise NotCompilable(field.field_name)
+        model = self.model
+        for number, attr in enumerate(field.source_attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                if hasattr(model, attr):
+                    raise NotCompilable(field.field_name)
+                return None
+            if number < len(field.source_attrs) - 1:
+                # Промежуточные связи должны быть обязательными, иначе DRF ведёт себя иначе на NULL
+                if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete \
+                        or model_field.null:
+                    raise NotCompilable(field.field_name)
+                model = model_field.related_model
+        return model_field, self.prefix + '__'.join(field.source_attrs)
+
+    def compile_field(self, name, field):
+        resolved = self.resolve(field)
+        if resolved is None:
+            if field.required or field.default is not empty or field.allow_null:
+                raise NotCompilable(name)
+            return
+        model_field, column = resolved
+
+        if isinstance(field, serializers.ListSerializer):
+            if self.prefix or len(field.source_attrs) > 1 or not model_field.one_to_many:
+                raise NotCompilable(name)
+            self.lists.append((name, model_field.related_model, CompiledSerializer(field.child), model_field.field.name))
+            self.getters.append((name, lambda row: None))
+        elif isinstance(field, serializers.BaseSerializer):
+            if not model_field.concrete or not (model_field.many_to_one or model_field.one_to_one):
+                raise NotCompilable(name)
+            nested = CompiledSerializer(field, prefix=column + '__')
+            if nested.lists:
+                raise NotCompilable(name)
+            self.columns |= nested.columns
+            if model_field.null:
+                self.getters.append((name, lambda row: None if row[nested.pk_column] is None else nested.build(row)))
+            else:
+                self.getters.append((name, nested.build))
+        elif isinstance(field, serializers.ManyRelatedField):
+            # Список первичных ключей связанных объектов, например позиций заказа
+            child = field.child_relation
+            if self.prefix or len(field.source_attrs) > 1 or not model_field.one_to_many \
+                    or type(child) is not serializers.PrimaryKeyRelatedField or child.pk_field is not None:
+                raise NotCompilable(name)
+            self.lists.append((name, model_field.related_model, None, model_field.field.name))
+            self.getters.append((name, lambda row: None))
+        elif isinstance(field, serializers.RelatedField):
+            if type(field) is not serializers.PrimaryKeyRelatedField or field.pk_field is not None \
+                    or not model_field.concrete or not model_field.is_relation:
+                raise NotCompilable(name)
+            self.columns.add(column)
+            self.getters.append((name, itemgetter(column)))
+        elif isinstance(field, VersatileImageFieldSerializer):
+            self.compile_image(name, field, model_field, column)
+        elif isinstance(field, serializers.FileField) or not model_field.concrete or model_field.is_relation:
+            raise NotCompilable(name)
+        else:
+            self.columns.add(column)
+            if type(model_field) in SIMPLE_MODEL_FIELDS and isinstance(field, SIMPLE_SERIALIZER_FIELDS):
+                self.getters.append((name, itemgetter(column)))
+            else:
+                convert = field.to_representation
+                self.getters.append((name, lambda row: None if row[column] is None else convert(row[column])))
+
+    def compile_image(self, name, field, model_field, column):
+        # Ссылки на варианты изображения строит сама библиотека по файлу изображения,
+        # поэтому для непустых изображений создаётся несохраняемый экземпляр модели
+        if len(field.source_attrs) > 1:
+            raise NotCompilable(name)
+        ppoi_field = getattr(model_field, 'ppoi_field', None)
+        ppoi_column = self.prefix + ppoi_field if ppoi_field else None
+        self.columns.update(filter(None, (column, ppoi_column)))
+        model = self.model
+
+        def image(row):
+            if not row[column] and not model_field.placeholder_image:
+                return {}
+            values = {model_field.attname: row[column]}
+            if ppoi_column:
+                values[ppoi_field] = row[ppoi_column]
+            return field.to_representation(getattr(model(**values), model_field.attname))
+
+        self.getters.append((name, image))
+
+    def values(self, queryset, *extra):
+        """
+        Выборка строк, достаточных для построения представления, и дополнительных полей extra.
+        """
+        return queryset.prefetch_related(None).values(*self.columns.union(extra))
+
+    def build(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    def serialize(self, rows):
+        """
+        Строит представления для строк выборки values().
+        """
+        rows = list(rows)
+        data = [self.build(row) for row in rows]
+        for name, model, child, fk_name in self.lists:
+            groups = defaultdict(list)
+            pks = [row[self.pk_column] for row in rows]
+            ordering = model._meta.ordering or ['pk']
+            for start in range(0, len(pks), LIST_BATCH_SIZE):
+                queryset = model._default_manager.filter(
+                    **{f'{fk_name}__in': pks[start:start + LIST_BATCH_SIZE]}
+                ).order_by(*ordering)
+                if child is None:
+                    for parent, pk in queryset.values_list(fk_name, 'pk'):
+                        groups[parent].append(pk)
+                    continue
+                child_rows = list(child.values(queryset, fk_name))
+                for child_row, item in zip(child_rows, child.serialize(child_rows)):
+                    groups[child_row[fk_name]].append(item)
+            for item, row in zip(data, rows):
+                item[name] = groups[row[self.pk_column]]
+        return data
@@ -0,0 +1,52 @@
+import django_filters
+from rest_framework.filters import OrderingFilter
+from .models import Product
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Фильтры каталога по сводным полям товара, которые покрыты индексами.
+    """
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock', label='В наличии')
+    price_min = django_filters.NumberFilter(field_name='min_price', lookup_expr='gte', label='Цена от')
+    price_max = django_filters.NumberFilter(field_name='min_price', lookup_expr='lte', label='Цена до')
+
+    class Meta:
+        model = Product
+        fields = ['category']
+
+    def filter_in_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(total_quantity__gt=0)
+        return queryset.filter(total_quantity=0)
+
+
+class CatalogOrderingFilter(OrderingFilter):
+    """
+    Сортировка каталога. Параметр price соответствует минимальной цене товара.
+    К ключу добавляется id, чтобы порядок равных значений был стабильным для курсора,
+    а товары без цены при сортировке по цене не выводятся.
+    """
+    aliases = {'price': 'min_price'}
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return self.get_default_ordering(view)
+        fields = []
+        for term in params.split(','):
+            term = term.strip()
+            field = self.aliases.get(term.lstrip('-'), term.lstrip('-'))
+            fields.append(f"{'-' if term.startswith('-') else ''}{field}")
+        ordering = self.remove_invalid_fields(queryset, fields, view, request)
+        if not ordering:
+            return self.get_default_ordering(view)
+        if ordering[0].lstrip('-') != 'id':
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering and ordering[0].lstrip('-') == 'min_price':
+            queryset = queryset.filter(min_price__isnull=False)
+        return super().filter_queryset(request, queryset, view)
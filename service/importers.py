@@ -0,0 +1,272 @@
+import hashlib
+import logging
+import time
+from decimal import Decimal
+from itertools import islice
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Product, ProductInfo, Shop, Category, ImportJob
+from .validation import clean_goods
+from .facets import refresh_facets
+from .catalog_cache import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+PRICE_QUANT = Decimal('0.01')
+
+# Поля строки прайса, изменение которых требует записи
+FINGERPRINT_FIELDS = ('shop', 'model', 'price', 'quantity', 'name', 'category')
+
+
+def chunked(iterable, size):
+    """
+    Разбивает итерируемый объект на списки длиной не более size.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def offer_fingerprint(row):
+    """
+    Отпечаток содержимого строки прайса.
+    Совпадение с сохранённым отпечатком означает, что строку можно не записывать.
+    """
+    payload = '\x1f'.join(str(row[field]) for field in FINGERPRINT_FIELDS)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def collect_references(items, shops, categories, batch_size=None):
+    """
+    Пропускает элементы прайса дальше, попутно собирая названия магазинов и категорий.
+    Названия берутся из строк, прошедших clean_goods, поэтому отклонённые строки справочники
+    не пополняют, а названия нормализуются так же, как при импорте.
+    """
+    for chunk in chunked(items, batch_size or settings.IMPORT_BATCH_SIZE):
+        records, _ = clean_goods(chunk)
+        for record in records:
+            shops.add(record['shop'])
+            categories.add(record['category'])
+        yield from chunk
+
+
+class ProductImporter:
+    """
+    Пакетный импорт товаров.
+    Существующие записи определяются несколькими запросами на пакет,
+    а запись выполняется через bulk_create/bulk_update.
+    Записываются только строки, отпечаток которых изменился.
+    """
+    # updated_at перечислен явно: bulk_update не заполняет поля auto_now
+    offer_fields = ('model', 'price', 'quantity', 'fingerprint', 'updated_at')
+
+    def __init__(self, batch_size=None, progress=None, offset=0):
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        # Номер строки файла, с которой начинаются элементы, например начало шарда
+        self.offset = offset
+        # progress(rows, counters) вызывается после фиксации каждого пакета
+        self.progress = progress
+        self.stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+        self.rows = 0
+        # Образец отклонённых строк для отчёта
+        self.rejected = []
+        self.timings = {'parse': 0.0, 'write': 0.0}
+        # Кеш соответствия название -> id на всё время импорта
+        self.shops = {}
+        self.categories = {}
+        # Категории, счётчики фасетов которых нужно пересчитать по окончании импорта
+        self.touched_categories = set()
+
+    def run(self, items):
+        """
+        Импортирует товары пакетами и возвращает статистику.
+        """
+        chunks = chunked(items, self.batch_size)
+        while True:
+            started = time.monotonic()
+            chunk = next(chunks, None)
+            self.timings['parse'] += time.monotonic() - started
+            if chunk is None:
+                started = time.monotonic()
+                if self.touched_categories:
+                    refresh_facets(self.touched_categories)
+                    bump_catalog_version()
+                self.timings['write'] += time.monotonic() - started
+                return self.stats
+
+            started = time.monotonic()
+            before = dict(self.stats)
+            self.import_batch(chunk)
+            self.timings['write'] += time.monotonic() - started
+            self.rows += len(chunk)
+            if self.progress:
+                self.progress(len(chunk), {key: self.stats[key] - before[key] for key in self.stats})
+
+    def import_batch(self, items):
+        """
+        Проверяет пакет товаров и импортирует чистые строки в одной транзакции.
+        """
+        records, rejected = clean_goods(items, offset=self.offset + self.rows)
+        self.stats['failed'] += len(rejected)
+        self.rejected.extend(rejected[:ImportJob.ERRORS_SAMPLE_SIZE - len(self.rejected)])
+        rows = [self.parse_item(record) for record in records]
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self.resolve_names(Shop, self.shops, {row['shop'] for row in rows})
+            self.resolve_names(Category, self.categories, {row['category'] for row in rows})
+            self.create_missing_products(rows)
+            self.upsert_offers(rows)
+
+    def create_references(self, shops, categories):
+        """
+        Заранее создаёт магазины и категории, чтобы параллельные шарды их только находили.
+        """
+        for names in chunked(shops, self.batch_size):
+            self.resolve_names(Shop, self.shops, set(names))
+        for names in chunked(categories, self.batch_size):
+            self.resolve_names(Category, self.categories, set(names))
+
+    @staticmethod
+    def parse_item(record):
+        """
+        Приводит проверенную запись прайса к типам модели.
+        """
+        return {
+            'id': record['id'],
+            'name': record['name'],
+            'category': record['category'],
+            'shop': record['shop'],
+            'model': record['model'],
+            'price': Decimal(str(record['price'])).quantize(PRICE_QUANT),
+            'quantity': record['quantity'],
+        }
+
+    @staticmethod
+    def resolve_names(model, cache, names):
+        """
+        Находит или создаёт записи справочника (магазины, категории) по названию.
+        """
+        missing = names - cache.keys()
+        if not missing:
+            return
+        cache.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+        missing -= cache.keys()
+        if missing:
+            # ignore_conflicts защищает от гонки с параллельным импортом
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            cache.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def create_missing_products(self, rows):
+        """
+        Создаёт отсутствующие товары.
+        """
+        existing = set(Product.objects.filter(id__in={row['id'] for row in rows}).values_list('id', flat=True))
+        new_products = {}
+        for row in rows:
+            if row['id'] not in existing and row['id'] not in new_products:
+                new_products[row['id']] = Product(
+                    id=row['id'], name=row['name'], category_id=self.categories[row['category']]
+                )
+        if new_products:
+            Product.objects.bulk_create(new_products.values(), batch_size=self.batch_size, ignore_conflicts=True)
+
+    def upsert_offers(self, rows):
+        """
+        Создаёт новые и обновляет изменившиеся предложения магазинов.
+        """
+        existing = {
+            (product_id, shop_id): (pk, fingerprint)
+            for product_id, shop_id, pk, fingerprint in ProductInfo.objects.filter(
+                product_id__in={row['id'] for row in rows},
+                shop_id__in={self.shops[row['shop']] for row in rows},
+            ).values_list('product_id', 'shop_id', 'id', 'fingerprint')
+        }
+
+        to_create = []
+        to_update = []
+        changed_rows = []
+        updated_at = timezone.now()
+        # Новые предложения неактивных магазинов сразу помечаются неактивными
+        inactive_shops = set(Shop.objects.filter(
+            id__in={self.shops[row['shop']] for row in rows}, state=False
+        ).values_list('id', flat=True))
+        for row in rows:
+            shop_id = self.shops[row['shop']]
+            values = {
+                'model': row['model'],
+                'price': row['price'],
+                'quantity': row['quantity'],
+                'fingerprint': offer_fingerprint(row),
+                'updated_at': updated_at,
+            }
+            current = existing.get((row['id'], shop_id))
+            if current is None:
+                to_create.append(ProductInfo(product_id=row['id'], shop_id=shop_id,
+                                             shop_active=shop_id not in inactive_shops, **values))
+            elif current[1] == values['fingerprint']:
+                self.stats['unchanged'] += 1
+            else:
+                to_update.append(ProductInfo(id=current[0], **values))
+                changed_rows.append(row)
+
+        if to_create:
+            self.create_offers(to_create)
+        if to_update:
+            ProductInfo.objects.bulk_update(to_update, self.offer_fields, batch_size=self.batch_size)
+            self.update_products(changed_rows)
+        if to_create or changed_rows:
+            # Цены и остатки изменились - обновляем сводку только затронутых товаров
+            product_ids = {offer.product_id for offer in to_create} | {row['id'] for row in changed_rows}
+            Product.refresh_aggregates(product_ids)
+            bump_catalog_version()
+            self.touched_categories.update(
+                Product.objects.filter(pk__in=product_ids).values_list('category_id', flat=True).distinct()
+            )
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += len(to_update)
+
+    def update_products(self, rows):
+        """
+        Обновляет название и категорию товаров изменившихся строк, если они отличаются.
+        """
+        current = {
+            pk: (name, category_id)
+            for pk, name, category_id in Product.objects.filter(
+                id__in={row['id'] for row in rows}
+            ).values_list('id', 'name', 'category_id')
+        }
+        to_update = {}
+        updated_at = timezone.now()
+        for row in rows:
+            values = (row['name'], self.categories[row['category']])
+            if current.get(row['id'], values) != values:
+                self.touched_categories.add(current[row['id']][1])
+                to_update[row['id']] = Product(
+                    id=row['id'], name=values[0], category_id=values[1], updated_at=updated_at
+                )
+        if to_update:
+            Product.objects.bulk_update(
+                to_update.values(), ['name', 'category', 'updated_at'], batch_size=self.batch_size
+            )
+
+    def create_offers(self, offers):
+        """
+        Вставляет предложения. Если СУБД поддерживает ON CONFLICT,
+        строки, созданные параллельным импортом, обновляются вместо ошибки.
+        """
+        if connection.features.supports_update_conflicts_with_target:
+            ProductInfo.objects.bulk_create(
+                offers,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['product', 'shop'],
+                update_fields=list(self.offer_fields),
+            )
+        else:
+            ProductInfo.objects.bulk_create(offers, batch_size=self.batch_size)
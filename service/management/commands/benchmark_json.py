@@ -0,0 +1,106 @@
+import io
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from service.renderers import ORJSONRenderer, ORJSONParser
+
+
+def catalog_payload(products):
+    """
+    Страница каталога в том виде, в каком её строит ProductSerializer.
+    """
+    now = timezone.now().isoformat()
+    return {
+        'next': None,
+        'previous': None,
+        'results': [
+            {
+                'id': number,
+                'category': {'id': number % 50, 'name': f'Категория {number % 50}'},
+                'image': {},
+                'name': f'Смартфон «Модель {number}»',
+                'image_ppoi': '(0.5, 0.5)',
+                'min_price': f'{Decimal(number) + Decimal("999.99"):.2f}',
+                'max_price': f'{Decimal(number) + Decimal("1999.99"):.2f}',
+                'total_quantity': number % 17,
+                'offers_count': number % 5,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for number in range(products)
+        ],
+    }
+
+
+def orders_payload(orders, items):
+    """
+    История заказов в том виде, в каком её строит OrderSerializer.
+    """
+    now = timezone.now().isoformat()
+    product = catalog_payload(1)['results'][0]
+    return [
+        {
+            'id': number,
+            'items': [
+                {
+                    'id': number * items + item,
+                    'product': {'id': item, 'product': product, 'model': f'M-{item}', 'price': '1999.99',
+                                'quantity': 10, 'fingerprint': '', 'updated_at': now, 'shop': 1},
+                    'quantity': item + 1,
+                    'order': number,
+                }
+                for item in range(items)
+            ],
+            'total_amount': '19999.90',
+            'status': 'delivered',
+            'created_at': now,
+        }
+        for number in range(orders)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время кодирования и разбора JSON стандартными средствами DRF и на orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help='Товаров на странице каталога')
+        parser.add_argument('--orders', type=int, default=500, help='Заказов в истории')
+        parser.add_argument('--items', type=int, default=5, help='Позиций в заказе')
+        parser.add_argument('--repeat', type=int, default=20, help='Повторов каждого замера')
+
+    def measure(self, action, repeat):
+        # Лучшее время из повторов меньше всего зависит от посторонней нагрузки
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            action()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        payloads = {
+            f'Каталог, {options["products"]} товаров': catalog_payload(options['products']),
+            f'Заказы, {options["orders"]} x {options["items"]} позиций': orders_payload(
+                options['orders'], options['items']),
+        }
+        repeat = options['repeat']
+        self.stdout.write(f'{"Ответ":<32}{"Операция":<12}{"DRF, мс":>10}{"orjson, мс":>12}{"Ускорение":>11}')
+        for title, payload in payloads.items():
+            content = JSONRenderer().render(payload)
+            timings = {
+                'рендеринг': (
+                    self.measure(lambda: JSONRenderer().render(payload), repeat),
+                    self.measure(lambda: ORJSONRenderer().render(payload), repeat),
+                ),
+                'разбор': (
+                    self.measure(lambda: JSONParser().parse(io.BytesIO(content)), repeat),
+                    self.measure(lambda: ORJSONParser().parse(io.BytesIO(content)), repeat),
+                ),
+            }
+            for operation, (standard, fast) in timings.items():
+                self.stdout.write(f'{title:<32}{operation:<12}{standard:>10.2f}{fast:>12.2f}{standard / fast:>10.1f}x')
+            self.stdout.write(f'{"":<32}{"размер":<12}{len(content) / 1024:>9.0f}К')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from service.facets import refresh_facets
+from service.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает счётчики фасетов каталога'
+
+    def handle(self, *args, **options):
+        category_ids = list(Category.objects.values_list('id', flat=True))
+        for start in range(0, len(category_ids), 100):
+            refresh_facets(category_ids[start:start + 100])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны фасеты категорий: {len(category_ids)}'))
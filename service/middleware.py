@@ -0,0 +1,97 @@
+import gzip
+import re
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    # Brotli сжимает JSON заметно лучше gzip, но без пакета остаётся только gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+# Сжимаются только ответы API. HTML админки и browsable API содержит CSRF-токен рядом с данными
+# из запроса, и его сжатие открывает подбор токена по размеру ответа (BREACH)
+COMPRESSIBLE_TYPES = ('application/json',)
+QUALITY_PARAM = re.compile(r';\s*q=([0-9.]+)')
+
+
+def available_encodings():
+    """
+    Поддерживаемые кодировки в порядке предпочтения.
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Выбирает кодировку сжатия по заголовку Accept-Encoding с учётом весов q.
+    Возвращает None, если клиент не принимает ни одну из поддерживаемых.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        name = part.split(';', 1)[0].strip().lower()
+        match = QUALITY_PARAM.search(part)
+        try:
+            weights[name] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            weights[name] = 0.0
+    best, best_weight = None, 0.0
+    for encoding in available_encodings():
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(content, encoding):
+    """
+    Сжимает содержимое ответа выбранной кодировкой.
+    """
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # Нулевое время в заголовке gzip делает результат воспроизводимым
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def precompress(content):
+    """
+    Сжатые варианты содержимого для всех поддерживаемых кодировок.
+    Сохраняются в кеше рядом с исходными байтами, чтобы не сжимать ответ при каждой выдаче.
+    """
+    if len(content) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(content, encoding) for encoding in available_encodings()}
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы на GET и HEAD в brotli или gzip по заголовку Accept-Encoding.
+    Готовые сжатые варианты берутся из атрибута ответа precompressed, если вид их приложил.
+    Потоковые ответы (выгрузка файлов экспорта) и частичное содержимое не сжимаются.
+    Ответы на прочие методы не сжимаются, чтобы не раскрывать секреты вроде токенов через размер (BREACH).
+    """
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD') or response.streaming or response.status_code == 206 \
+                or response.has_header('Content-Encoding') \
+                or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES) \
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+        compressed = getattr(response, 'precompressed', {}).get(encoding) or compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Сжатое представление не совпадает побайтно с исходным, поэтому ETag становится слабым
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
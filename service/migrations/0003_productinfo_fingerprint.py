@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0002_productinfo_unique_product_shop'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productinfo',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=32, verbose_name='Отпечаток строки прайса'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0004_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(verbose_name='ID продукта')),
+                ('shop', models.CharField(max_length=80, verbose_name='Магазин')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Удалено')),
+            ],
+            options={
+                'verbose_name': 'Удалённое предложение',
+                'verbose_name_plural': 'Удалённые предложения',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменён'),
+        ),
+        migrations.AddField(
+            model_name='productinfo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+        migrations.CreateModel(
+            name='ProductExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('full', 'Полный'), ('delta', 'Изменения')], default='full', max_length=5, verbose_name='Вид')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Строк')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Контрольная сумма')),
+                ('since', models.DateTimeField(blank=True, null=True, verbose_name='Изменения с')),
+                ('high_water_mark', models.DateTimeField(verbose_name='Метка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deltas', to='service.productexport', verbose_name='Базовый экспорт')),
+                ('previous', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='service.productexport', verbose_name='Предыдущий экспорт')),
+            ],
+            options={
+                'verbose_name': 'Экспорт каталога',
+                'verbose_name_plural': 'Экспорты каталога',
+                'ordering': ('-high_water_mark', '-id'),
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0005_export_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productexport',
+            name='catalog_version',
+            field=models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Версия каталога'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+# SQL индекса зафиксирован в миграции, чтобы последующие правки service.search не меняли её поведение
+
+# SQLite: таблица FTS5, rowid которой совпадает с id товара. Триггеры, поддерживающие её актуальной,
+# ссылаются на таблицы товаров и категорий и помешали бы их пересозданию в последующих миграциях,
+# поэтому их ставит после миграций обработчик post_migrate (service.search.restore_search_triggers)
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS service_product_fts "
+    "USING fts5(name, category, tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM service_product_fts",
+    "INSERT INTO service_product_fts(rowid, name, category) "
+    "SELECT product.id, product.name, category.name FROM service_product AS product "
+    "JOIN service_category AS category ON category.id = product.category_id",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS service_category_fts_update",
+    "DROP TRIGGER IF EXISTS service_product_fts_delete",
+    "DROP TRIGGER IF EXISTS service_product_fts_update",
+    "DROP TRIGGER IF EXISTS service_product_fts_insert",
+    "DROP TABLE IF EXISTS service_product_fts",
+]
+
+# PostgreSQL: колонка tsvector с GIN-индексом, которую заполняет триггер
+POSTGRESQL_INSTALL = [
+    "ALTER TABLE service_product ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS service_product_search_vector ON service_product USING GIN (search_vector)",
+    """CREATE OR REPLACE FUNCTION service_product_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(
+                (SELECT name FROM service_category WHERE id = NEW.category_id), '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS service_product_search_vector ON service_product",
+    "CREATE TRIGGER service_product_search_vector BEFORE INSERT OR UPDATE OF name, category_id "
+    "ON service_product FOR EACH ROW EXECUTE FUNCTION service_product_search_vector()",
+    """CREATE OR REPLACE FUNCTION service_category_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE service_product SET name = name WHERE category_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS service_category_search_vector ON service_category",
+    "CREATE TRIGGER service_category_search_vector AFTER UPDATE OF name ON service_category "
+    "FOR EACH ROW EXECUTE FUNCTION service_category_search_vector()",
+]
+
+POSTGRESQL_REBUILD = [
+    "UPDATE service_product SET name = name",
+]
+
+POSTGRESQL_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS service_category_search_vector ON service_category",
+    "DROP FUNCTION IF EXISTS service_category_search_vector()",
+    "DROP TRIGGER IF EXISTS service_product_search_vector ON service_product",
+    "DROP FUNCTION IF EXISTS service_product_search_vector()",
+    "DROP INDEX IF EXISTS service_product_search_vector",
+    "ALTER TABLE service_product DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_statements(statements):
+    """
+    Операция RunPython, выполняющая SQL для текущей СУБД.
+    """
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0006_productexport_catalog_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_INSTALL + SQLITE_REBUILD,
+                            'postgresql': POSTGRESQL_INSTALL + POSTGRESQL_REBUILD}),
+            run_statements({'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRESQL_UNINSTALL}),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:36
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_aggregates(apps, schema_editor):
+    Product = apps.get_model('service', 'Product')
+    ProductInfo = apps.get_model('service', 'ProductInfo')
+    offers = ProductInfo.objects.filter(product=models.OuterRef('pk'), shop__state=True).order_by().values('product')
+    Product.objects.update(
+        min_price=models.Subquery(offers.annotate(value=models.Min('price')).values('value')),
+        max_price=models.Subquery(offers.annotate(value=models.Max('price')).values('value')),
+        total_quantity=Coalesce(models.Subquery(offers.annotate(value=models.Sum('quantity')).values('value')), 0),
+        offers_count=Coalesce(models.Subquery(offers.annotate(value=models.Count('id')).values('value')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Создан'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Максимальная цена'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Минимальная цена'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='offers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Предложений'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_quantity',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Остаток'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_price', 'id'], name='product_min_price_id'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='product_created_at_id'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['total_quantity'], name='product_total_quantity'),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0008_product_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('category', 'Категория'), ('shop', 'Магазин'), ('price', 'Ценовой диапазон')], max_length=10, verbose_name='Измерение')),
+                ('band', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Ценовой диапазон')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='service.category', verbose_name='Категория')),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='service.shop', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'Счётчик фасета',
+                'verbose_name_plural': 'Счётчики фасетов',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+def fill_shop_active(apps, schema_editor):
+    ProductInfo = apps.get_model('service', 'ProductInfo')
+    ProductInfo.objects.filter(shop__state=False).update(shop_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0010_productinfo_product_price'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productinfo',
+            name='productinfo_product_price',
+        ),
+        migrations.AddField(
+            model_name='productinfo',
+            name='shop_active',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Магазин активен'),
+        ),
+        migrations.RunPython(fill_shop_active, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=models.Index(condition=models.Q(('shop_active', True)), fields=['product', 'price'], name='productinfo_active_price'),
+        ),
+    ]
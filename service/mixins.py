@@ -0,0 +1,162 @@
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+from .catalog_cache import LIST_SCOPE, catalog_cache_key, catalog_versions
+from .serializers import related_lookups
+from .fast_serializers import CompiledSerializer, NotCompilable
+from .middleware import precompress
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Вид выполнил больше SQL-запросов, чем допускает его бюджет.
+    """
+
+
+class QueryBudgetMixin:
+    """
+    Ограничивает число SQL-запросов на один запрос к виду.
+    Превышение бюджета пишется в лог, а при QUERY_BUDGET_STRICT приводит к ошибке,
+    поэтому появившийся N+1 сразу ловится тестами.
+    """
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if len(queries) > self.query_budget:
+            message = (f'{type(self).__name__}: выполнено {len(queries)} SQL-запросов '
+                       f'при бюджете {self.query_budget}')
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class SparseQuerysetMixin:
+    """
+    Подстраивает select_related и prefetch_related выборки под поля,
+    запрошенные параметрами fields и expand: невыдаваемые связи не загружаются.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related(None).prefetch_related(None)
+        select, prefetch = related_lookups(self.get_serializer())
+        if select:
+            queryset = queryset.select_related(*select)
+        return queryset.prefetch_related(*prefetch)
+
+
+class CompiledSerializerMixin:
+    """
+    Собирает ответ чтения скомпилированным сериализатором по строкам .values(),
+    не создавая экземпляры моделей и ModelSerializer на каждый объект.
+    Если поля сериализатора не поддаются компиляции, работает обычный путь DRF.
+    """
+    compiled_serializer = True
+
+    def get_compiled_serializer(self):
+        if not self.compiled_serializer:
+            return None
+        try:
+            return CompiledSerializer(self.get_serializer())
+        except NotCompilable:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        extra = ()
+        if hasattr(self.paginator, 'get_ordering'):
+            # Курсор строится по значениям полей сортировки, поэтому они нужны в строках
+            extra = [name.lstrip('-') for name in self.paginator.get_ordering(request, queryset, self)]
+        rows = compiled.values(queryset, *extra)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page))
+        return Response(compiled.serialize(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        instance = self.get_object()
+        rows = compiled.values(type(instance)._default_manager.filter(pk=instance.pk))
+        return Response(compiled.serialize(rows)[0])
+
+
+class CatalogCacheMixin:
+    """
+    Кеширует готовый JSON ответа списка по параметрам запроса и версии каталога.
+    Ответ содержит ETag и Last-Modified, на условные запросы с ними отдаётся 304.
+    Вместе с JSON хранятся его сжатые варианты для CompressionMiddleware.
+    Кеш сбрасывается сменой версии каталога при фиксации изменений товаров и предложений.
+    Ключ включает и версии областей из get_cache_scopes, поэтому изменение одной категории
+    или товара не сбрасывает ответы по остальным.
+    """
+    cache_scopes = (LIST_SCOPE,)
+
+    def get_cache_scopes(self, request):
+        return self.cache_scopes
+
+    def list(self, request, *args, **kwargs):
+        if not settings.CATALOG_CACHE_TIMEOUT or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        versions = catalog_versions(self.get_cache_scopes(request))
+        key = catalog_cache_key(request, versions)
+        entry = cache.get(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            entry = {
+                'content': content,
+                'encoded': precompress(content),
+                'etag': quote_etag(hashlib.blake2b(content, digest_size=16).hexdigest()),
+                'last_modified': max(versions) // 10 ** 9,
+            }
+            cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+
+        if self.not_modified(request, entry):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(entry['content'], content_type=request.accepted_renderer.media_type)
+            response.precompressed = entry.get('encoded', {})
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        return response
+
+    @staticmethod
+    def not_modified(request, entry):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # Слабое сравнение: после сжатия клиент получает ETag с префиксом W/
+            etags = [etag.removeprefix('W/') for etag in parse_etags(if_none_match)]
+            return entry['etag'] in etags or '*' in etags
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and entry['last_modified'] <= if_modified_since
@@ -3,6 +3,7 @@ from datetime import timedelta
 import jwt
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager, AbstractUser
 from django.utils import timezone
 from django.utils.crypto import get_random_string
@@ -124,14 +125,66 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="products", verbose_name='Категория')  # К какой категории относится товар
     image = VersatileImageField('Product Image', upload_to='products/', ppoi_field='image_ppoi', blank=True, null=True)
     image_ppoi = PPOIField()
+    # Сводка по предложениям активных магазинов, пересчитывается при их изменении
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, verbose_name='Минимальная цена')
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, verbose_name='Максимальная цена')
+    total_quantity = models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Остаток')  # Суммарное количество во всех магазинах
+    offers_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Предложений')  # Число предложений активных магазинов
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменён')  # Метка для инкрементального экспорта
 
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
+        indexes = [
+            # Ключи сортировки каталога вместе с id, по которому курсор различает равные значения
+            models.Index(fields=['min_price', 'id'], name='product_min_price_id'),
+            models.Index(fields=['created_at', 'id'], name='product_created_at_id'),
+            models.Index(fields=['total_quantity'], name='product_total_quantity'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def refresh_aggregates(cls, product_ids):
+        """
+        Пересчитывает сводку по предложениям для указанных товаров одним UPDATE на пакет.
+        """
+        offers = ProductInfo.objects.active().filter(product=models.OuterRef('pk')).order_by().values('product')
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), 500):
+            cls.objects.filter(pk__in=product_ids[start:start + 500]).update(
+                min_price=models.Subquery(offers.annotate(value=models.Min('price')).values('value')),
+                max_price=models.Subquery(offers.annotate(value=models.Max('price')).values('value')),
+                total_quantity=Coalesce(models.Subquery(offers.annotate(value=models.Sum('quantity')).values('value')), 0),
+                offers_count=Coalesce(models.Subquery(offers.annotate(value=models.Count('id')).values('value')), 0),
+            )
+
+    # Поля сводки пишет только refresh_aggregates
+    AGGREGATE_FIELDS = ('min_price', 'max_price', 'total_quantity', 'offers_count')
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # В загруженном ранее экземпляре сводка может быть устаревшей, поэтому её не перезаписываем
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+class ProductInfoQuerySet(models.QuerySet):
+    """
+    Выборки предложений.
+    """
+
+    def active(self):
+        """
+        Предложения активных магазинов. Фильтр по флагу предложения обходится без соединения с магазином.
+        """
+        return self.filter(shop_active=True)
+
+
 class ProductInfo(models.Model):
     """
     Подробная информация о товаре.
@@ -142,14 +195,52 @@ class ProductInfo(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)], verbose_name='Цена')  # Цена товара
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(0)], verbose_name='Количество')  # Количество товара
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="product_infos", verbose_name='Магазин')  # Магазин-продавец
+    fingerprint = models.CharField(max_length=32, blank=True, editable=False, verbose_name='Отпечаток строки прайса')  # Хеш содержимого последней импортированной строки
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменено')  # Метка для инкрементального экспорта
+    shop_active = models.BooleanField(default=True, editable=False, verbose_name='Магазин активен')  # Копия Shop.state, обновляется при переключении магазина
+
+    objects = ProductInfoQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Информация о продукте'
         verbose_name_plural = 'Информационные карточки продуктов'
+        constraints = [
+            # Одно предложение товара на магазин, используется как ключ при импорте
+            models.UniqueConstraint(fields=['product', 'shop'], name='unique_product_shop'),
+        ]
+        indexes = [
+            # Предложения активных магазинов по товару сразу в порядке цены:
+            # сравнение магазинов и сводка товара читают только этот индекс
+            models.Index(fields=['product', 'price'], condition=models.Q(shop_active=True),
+                         name='productinfo_active_price'),
+        ]
 
     def __str__(self):
         return f'{self.product}: {self.shop}'
 
+    def save(self, *args, **kwargs):
+        # Ручное изменение сбрасывает отпечаток, чтобы следующий импорт перезаписал строку
+        self.fingerprint = ''
+        # Активность берётся из базы: экземпляр магазина в памяти может быть устаревшим
+        self.shop_active = Shop.objects.filter(pk=self.shop_id).values_list('state', flat=True).first() is not False
+        super().save(*args, **kwargs)
+
+class DeletedOffer(models.Model):
+    """
+    Запись об удалённом предложении магазина.
+    Нужна инкрементальному экспорту, чтобы передать удаление потребителям.
+    """
+    product_id = models.BigIntegerField(verbose_name='ID продукта')  # Товар удалённого предложения
+    shop = models.CharField(max_length=80, verbose_name='Магазин')  # Название магазина, как в файле экспорта
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Удалено')
+
+    class Meta:
+        verbose_name = 'Удалённое предложение'
+        verbose_name_plural = 'Удалённые предложения'
+
+    def __str__(self):
+        return f'{self.product_id}: {self.shop}'
+
 class Order(models.Model):
     """
     Заказ покупателя.
@@ -247,4 +338,161 @@ class CartItem(models.Model):
         verbose_name_plural = 'Товары в корзинах'
 
     def __str__(self):
-        return f"{self.product} ({self.quantity})"
\ No newline at end of file
+        return f"{self.product} ({self.quantity})"
+
+class ImportJob(models.Model):
+    """
+    Задача импорта прайса и её прогресс.
+    Воркеры обновляют счётчики пакетами, клиент опрашивает одну строку по первичному ключу.
+    """
+    STATUS_CHOICES = [
+        ("pending", "В очереди"),  # Файл принят, задача ожидает воркер
+        ("running", "Выполняется"),  # Идёт импорт
+        ("done", "Завершён"),  # Импорт успешно завершён
+        ("failed", "Ошибка"),  # Импорт завершился ошибкой
+    ]
+    ERRORS_SAMPLE_SIZE = 20  # Сколько ошибок хранить в образце
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="import_jobs", verbose_name='Пользователь')  # Кто загрузил прайс
+    task_id = models.CharField(max_length=255, blank=True, verbose_name='ID задачи Celery')
+    file_name = models.CharField(max_length=255, blank=True, verbose_name='Имя файла')
+    checksum = models.CharField(max_length=64, blank=True, verbose_name='Контрольная сумма')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending", verbose_name='Статус')
+    result = models.CharField(max_length=255, blank=True, verbose_name='Результат')  # Итоговый результат задачи
+    rows_total = models.PositiveIntegerField(null=True, blank=True, verbose_name='Всего строк')  # Известно после разбора файла
+    rows_processed = models.PositiveIntegerField(default=0, verbose_name='Обработано строк')
+    created = models.PositiveIntegerField(default=0, verbose_name='Создано')
+    updated = models.PositiveIntegerField(default=0, verbose_name='Обновлено')
+    unchanged = models.PositiveIntegerField(default=0, verbose_name='Без изменений')
+    failed = models.PositiveIntegerField(default=0, verbose_name='С ошибками')
+    timings = models.JSONField(default=dict, blank=True, verbose_name='Время этапов, с')
+    errors = models.JSONField(default=list, blank=True, verbose_name='Образец ошибок')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начат')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершён')
+
+    class Meta:
+        verbose_name = 'Импорт прайса'
+        verbose_name_plural = 'Импорты прайсов'
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'Импорт №{self.pk} ({self.get_status_display()})'
+
+    @classmethod
+    def start(cls, job_id):
+        """
+        Отмечает начало обработки файла воркером.
+        """
+        if job_id:
+            cls.objects.filter(pk=job_id).update(status='running', started_at=now())
+
+    @classmethod
+    def add_progress(cls, job_id, rows, counters):
+        """
+        Атомарно увеличивает счётчики. Безопасно при параллельной работе шардов.
+        """
+        if job_id:
+            cls.objects.filter(pk=job_id).update(
+                rows_processed=models.F('rows_processed') + rows,
+                **{field: models.F(field) + value for field, value in counters.items() if value},
+            )
+
+    @classmethod
+    def finish(cls, job_id, result, rows_total=None, timings=None, errors=None):
+        """
+        Фиксирует итог импорта.
+        errors - образец ошибок: {'error': ...} для сбоев и отчёты по отклонённым строкам.
+        """
+        if not job_id:
+            return
+        job = cls.objects.filter(pk=job_id).first()
+        if job is None:
+            return
+        job.result = result['result'][:255]
+        job.status = 'done' if result['result'] == 'IMPORT_SUCCESSFUL' else 'failed'
+        if rows_total is not None:
+            job.rows_total = rows_total
+        job.timings = {**job.timings, **(timings or {})}
+        errors = list(errors or [])
+        if job.status == 'failed' and {'error': job.result} not in errors:
+            errors.insert(0, {'error': job.result})
+        job.errors = (job.errors + errors)[:cls.ERRORS_SAMPLE_SIZE]
+        job.finished_at = now()
+        job.save(update_fields=['result', 'status', 'rows_total', 'timings', 'errors', 'finished_at'])
+
+
+class ProductExport(models.Model):
+    """
+    Сформированный файл экспорта каталога.
+    Инкрементальный экспорт содержит изменения с метки предыдущего файла и ссылается на базовый полный экспорт.
+    """
+    KIND_CHOICES = [
+        ("full", "Полный"),  # Весь каталог
+        ("delta", "Изменения"),  # Изменения с предыдущего экспорта
+    ]
+
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES, default="full", verbose_name='Вид')
+    format = models.CharField(max_length=10, verbose_name='Формат')
+    filename = models.CharField(max_length=255, verbose_name='Имя файла')
+    rows = models.PositiveIntegerField(default=0, verbose_name='Строк')
+    size = models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')
+    checksum = models.CharField(max_length=64, verbose_name='Контрольная сумма')  # SHA-256 файла
+    since = models.DateTimeField(null=True, blank=True, verbose_name='Изменения с')  # Метка предыдущего экспорта для вида delta
+    high_water_mark = models.DateTimeField(verbose_name='Метка')  # Момент, по состоянию на который выгружен каталог
+    catalog_version = models.CharField(max_length=32, blank=True, db_index=True, verbose_name='Версия каталога')  # Совпадает у экспортов одного состояния каталога
+    base = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name="deltas", verbose_name='Базовый экспорт')  # Полный экспорт, к которому применяются изменения
+    previous = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name='Предыдущий экспорт')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    class Meta:
+        verbose_name = 'Экспорт каталога'
+        verbose_name_plural = 'Экспорты каталога'
+        ordering = ('-high_water_mark', '-id')
+
+    def __str__(self):
+        return self.filename
+
+    def manifest(self):
+        """
+        Описание файла экспорта, которое сохраняется рядом с ним.
+        """
+        return {
+            'file': self.filename,
+            'kind': self.kind,
+            'format': self.format,
+            'rows': self.rows,
+            'size': self.size,
+            'checksum': self.checksum,
+            'since': self.since.isoformat() if self.since else None,
+            'high_water_mark': self.high_water_mark.isoformat(),
+            'catalog_version': self.catalog_version,
+            'base': self.base.filename if self.base else None,
+            'previous': self.previous.filename if self.previous else None,
+        }
+
+
+class CatalogFacet(models.Model):
+    """
+    Материализованный счётчик фасета каталога в разрезе категории.
+    Пересчитывается для затронутых категорий при импорте и изменении предложений,
+    поэтому каталог получает счётчики одним запросом к небольшой таблице.
+    """
+    DIMENSION_CHOICES = [
+        ("category", "Категория"),  # Товары категории, которые есть в продаже
+        ("shop", "Магазин"),  # Предложения магазина в категории
+        ("price", "Ценовой диапазон"),  # Товары категории с минимальной ценой в диапазоне
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES, verbose_name='Измерение')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="facets", verbose_name='Категория')
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True, blank=True, related_name="+", verbose_name='Магазин')
+    band = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Ценовой диапазон')  # Номер диапазона из CATALOG_PRICE_BANDS
+    count = models.PositiveIntegerField(default=0, verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Счётчик фасета'
+        verbose_name_plural = 'Счётчики фасетов'
+
+    def __str__(self):
+        return f'{self.get_dimension_display()}: {self.count}'
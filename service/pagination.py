@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    Постраничный вывод каталога по курсору.
+    Страница выбирается условием по индексированному ключу сортировки, а не OFFSET,
+    и без подсчёта общего числа строк, поэтому дальние страницы стоят столько же, сколько первая.
+    """
+    ordering = 'id'
+    page_size = settings.CATALOG_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.CATALOG_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        # Результаты полнотекстового поиска без явной сортировки идут по релевантности
+        if 'search_rank' in queryset.query.annotations and not request.query_params.get(api_settings.ORDERING_PARAM):
+            return ('search_rank', 'id')
+        return super().get_ordering(request, queryset, view)
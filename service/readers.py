@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import os
+from openpyxl import load_workbook
+from yaml.composer import ComposerError
+from yaml.events import (AliasEvent, ScalarEvent, SequenceStartEvent, SequenceEndEvent, MappingStartEvent,
+                         MappingEndEvent, CollectionStartEvent, CollectionEndEvent, StreamEndEvent)
+from yaml.nodes import ScalarNode, SequenceNode, MappingNode
+
+try:
+    # Загрузчик на libyaml заметно быстрее, используем его при наличии
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+class InvalidPriceList(Exception):
+    """
+    Файл прайса имеет неверную структуру.
+    """
+
+
+def iter_yaml_goods(stream):
+    """
+    Потоково читает элементы раздела goods из YAML-прайса.
+    Документ разбирается по событиям, поэтому в памяти одновременно
+    находится только один элемент, а не всё дерево документа.
+    """
+    loader = SafeLoader(stream)
+    anchors = {}
+    try:
+        loader.get_event()  # StreamStartEvent
+        if loader.check_event(StreamEndEvent):
+            raise InvalidPriceList('Пустой файл')
+        loader.get_event()  # DocumentStartEvent
+        if not loader.check_event(MappingStartEvent):
+            raise InvalidPriceList('Корневой элемент должен быть словарём')
+        loader.get_event()
+
+        found = False
+        while not loader.check_event(MappingEndEvent):
+            key = loader.construct_document(_compose_node(loader, anchors))
+            if key == 'goods' and loader.check_event(SequenceStartEvent):
+                found = True
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    # construct_document сбрасывает кеш построенных объектов загрузчика
+                    yield loader.construct_document(_compose_node(loader, anchors))
+                loader.get_event()
+            else:
+                _skip_node(loader, anchors)
+        if not found:
+            raise InvalidPriceList('Отсутствует раздел goods')
+    finally:
+        loader.dispose()
+
+
+def iter_jsonl_goods(stream):
+    """
+    Читает элементы прайса в формате JSON Lines: один товар на строку.
+    """
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise InvalidPriceList(f'Строка {number}: {e}')
+
+
+def iter_csv_goods(stream):
+    """
+    Потоково читает прайс в формате CSV с заголовком. Разделитель определяется автоматически.
+    Пустые ячейки считаются отсутствующими значениями.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        header = _normalize_header(next(reader, []))
+        for row in reader:
+            yield {key: value for key, value in zip(header, row) if key and value != ''}
+    finally:
+        # Поток принадлежит вызывающему коду, обёртку отсоединяем без закрытия файла
+        text.detach()
+
+
+def iter_xlsx_goods(stream):
+    """
+    Читает первый лист книги XLSX построчно, не загружая её целиком.
+    Первая строка листа - заголовок.
+    """
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+        for row in rows:
+            item = {key: value for key, value in zip(header, row) if key and value not in (None, '')}
+            if item:
+                yield item
+    finally:
+        workbook.close()
+
+
+def _normalize_header(header):
+    columns = [str(column).strip().lower() if column is not None else '' for column in header]
+    if not {'id', 'name'} <= set(columns):
+        raise InvalidPriceList('Заголовок должен содержать колонки id и name')
+    return columns
+
+
+READERS = {
+    'yaml': iter_yaml_goods,
+    'csv': iter_csv_goods,
+    'jsonl': iter_jsonl_goods,
+    'xlsx': iter_xlsx_goods,
+}
+
+EXTENSIONS = {
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.xlsx': 'xlsx',
+}
+
+
+def detect_format(name, head):
+    """
+    Определяет формат прайса по расширению файла, а при его отсутствии - по первым байтам.
+    """
+    extension = os.path.splitext(name or '')[1].lower()
+    if extension in EXTENSIONS:
+        return EXTENSIONS[extension]
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if head.lstrip().startswith(b'{'):
+        return 'jsonl'
+    # Комментарии, директивы и начало документа YAML не участвуют в определении разделителей
+    lines = (line.strip() for line in head.splitlines())
+    first_line = next((line for line in lines if line and not line.startswith((b'#', b'%', b'---'))), b'')
+    if b':' not in first_line and any(delimiter in first_line for delimiter in (b',', b';', b'\t')):
+        return 'csv'
+    return 'yaml'
+
+
+def iter_goods(stream, name=None):
+    """
+    Возвращает итератор элементов прайса, выбирая читатель по формату файла.
+    """
+    head = stream.read(1024)
+    stream.seek(0)
+    return READERS[detect_format(name, head)](stream)
+
+
+def _resolve_tag(loader, kind, event, value=None):
+    if event.tag is None or event.tag == '!':
+        return loader.resolve(kind, value, event.implicit)
+    return event.tag
+
+
+def _compose_node(loader, anchors):
+    """
+    Собирает узел YAML из очередных событий парсера.
+    Аналог Composer.compose_node, который недоступен у загрузчика на libyaml.
+    """
+    event = loader.get_event()
+    if isinstance(event, AliasEvent):
+        if event.anchor not in anchors:
+            raise ComposerError(None, None, f'found undefined alias {event.anchor!r}', event.start_mark)
+        return anchors[event.anchor]
+
+    if isinstance(event, ScalarEvent):
+        node = ScalarNode(_resolve_tag(loader, ScalarNode, event, event.value), event.value,
+                          event.start_mark, event.end_mark, style=event.style)
+    elif isinstance(event, SequenceStartEvent):
+        node = SequenceNode(_resolve_tag(loader, SequenceNode, event), [],
+                            event.start_mark, None, flow_style=event.flow_style)
+        while not loader.check_event(SequenceEndEvent):
+            node.value.append(_compose_node(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        node = MappingNode(_resolve_tag(loader, MappingNode, event), [],
+                           event.start_mark, None, flow_style=event.flow_style)
+        while not loader.check_event(MappingEndEvent):
+            key_node = _compose_node(loader, anchors)
+            node.value.append((key_node, _compose_node(loader, anchors)))
+        node.end_mark = loader.get_event().end_mark
+
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+def _skip_node(loader, anchors):
+    """
+    Пропускает очередной узел, не строя его в памяти.
+    Узлы с якорями собираются в anchors: на них могут ссылаться псевдонимы в разделе goods.
+    """
+    depth = 0
+    while True:
+        event = loader.peek_event()
+        if not isinstance(event, AliasEvent) and getattr(event, 'anchor', None) is not None:
+            _compose_node(loader, anchors)
+        else:
+            loader.get_event()
+            if isinstance(event, CollectionStartEvent):
+                depth += 1
+            elif isinstance(event, CollectionEndEvent):
+                depth -= 1
+        if depth == 0:
+            return
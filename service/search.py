@@ -0,0 +1,111 @@
+import re
+from django.db import connection, connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+# Индекс SQLite: таблица FTS5 service_product_fts (создаётся миграцией 0007), rowid которой совпадает с id товара.
+# Триггеры поддерживают её в актуальном состоянии при любой записи, включая bulk_create/bulk_update импорта
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS service_product_fts_insert AFTER INSERT ON service_product BEGIN "
+    "INSERT INTO service_product_fts(rowid, name, category) VALUES "
+    "(new.id, new.name, (SELECT name FROM service_category WHERE id = new.category_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS service_product_fts_update AFTER UPDATE OF name, category_id ON service_product "
+    "BEGIN DELETE FROM service_product_fts WHERE rowid = old.id; "
+    "INSERT INTO service_product_fts(rowid, name, category) VALUES "
+    "(new.id, new.name, (SELECT name FROM service_category WHERE id = new.category_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS service_product_fts_delete AFTER DELETE ON service_product BEGIN "
+    "DELETE FROM service_product_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS service_category_fts_update AFTER UPDATE OF name ON service_category BEGIN "
+    "UPDATE service_product_fts SET category = new.name "
+    "WHERE rowid IN (SELECT id FROM service_product WHERE category_id = new.id); END",
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM service_product_fts",
+    "INSERT INTO service_product_fts(rowid, name, category) "
+    "SELECT product.id, product.name, category.name FROM service_product AS product "
+    "JOIN service_category AS category ON category.id = product.category_id",
+]
+
+SQLITE_DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS service_category_fts_update",
+    "DROP TRIGGER IF EXISTS service_product_fts_delete",
+    "DROP TRIGGER IF EXISTS service_product_fts_update",
+    "DROP TRIGGER IF EXISTS service_product_fts_insert",
+]
+
+
+def suspend_search_triggers(sender, using, **kwargs):
+    """
+    Перед миграциями удаляет триггеры индекса SQLite. Пересоздание таблицы товаров или категорий
+    удаляет триггеры самой таблицы, а триггеры, ссылающиеся на неё из другой таблицы, не дают её переименовать.
+    Благодаря этому миграциям не нужно обходить триггеры самим.
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for statement in SQLITE_DROP_TRIGGERS:
+                cursor.execute(statement)
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    """
+    После миграций восстанавливает триггеры индекса SQLite и перестраивает индекс:
+    без триггеров миграции могли изменить товары. Если индекса нет (миграция 0007 не применена), ничего не делает.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or 'service_product_fts' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS + SQLITE_REBUILD:
+            cursor.execute(statement)
+
+
+def search_products(queryset, text):
+    """
+    Оставляет товары, название или категория которых содержат все слова запроса (в том числе как префиксы),
+    и добавляет аннотацию search_rank: чем меньше значение, тем релевантнее товар.
+    Возвращает None, если у СУБД нет полнотекстового индекса.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        query = ' '.join(f'"{word}"*' for word in words)
+        matches = RawSQL('SELECT rowid FROM service_product_fts WHERE service_product_fts MATCH %s', [query])
+        # bm25 отрицателен и убывает с ростом релевантности; совпадение в названии весит вдвое больше
+        rank = RawSQL(
+            'SELECT bm25(service_product_fts, 2.0, 1.0) FROM service_product_fts '
+            'WHERE service_product_fts MATCH %s AND rowid = service_product.id',
+            [query], output_field=FloatField(),
+        )
+    elif connection.vendor == 'postgresql':
+        query = ' & '.join(f'{word}:*' for word in words)
+        matches = RawSQL(
+            "SELECT id FROM service_product WHERE search_vector @@ to_tsquery('russian', %s)", [query]
+        )
+        rank = RawSQL(
+            "-ts_rank(service_product.search_vector, to_tsquery('russian', %s))",
+            [query], output_field=FloatField(),
+        )
+    else:
+        return None
+    return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Поиск товаров по параметру search через полнотекстовый индекс.
+    На СУБД без индекса работает как обычный SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        result = search_products(queryset, ' '.join(terms))
+        if result is None:
+            return super().filter_queryset(request, queryset, view)
+        return result
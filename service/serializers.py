@@ -10,15 +10,96 @@ from .tasks import *
 from versatileimagefield.serializers import VersatileImageFieldSerializer
 
 
+def parse_field_paths(value):
+    """
+    Разбирает список полей вида "id,name,category.name" в дерево {'id': {}, 'name': {}, 'category': {'name': {}}}.
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsMixin:
+    """
+    Позволяет выбрать часть полей сериализатора параметрами запроса fields и expand,
+    например ?fields=id,name,min_price или ?fields=id,category.name.
+    Без fields выдаются все поля, как раньше. С fields вложенный объект раскрывается,
+    только если он указан в expand или через точку, иначе вместо него выдаётся первичный ключ.
+    Неупомянутые поля не вычисляются вовсе, в том числе ссылки на изображения.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.sparse_fields = kwargs.pop('fields', None)
+        self.expand_fields = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+    def is_root_serializer(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse, expand = self.sparse_fields, self.expand_fields
+        if sparse is None and self.is_root_serializer():
+            params = getattr(self.context.get('request'), 'query_params', {})
+            if 'fields' in params:
+                sparse, expand = parse_field_paths(params['fields']), parse_field_paths(params.get('expand'))
+        if sparse is None:
+            return fields
+
+        expand = expand or {}
+        for name in list(fields):
+            if name not in sparse:
+                del fields[name]
+                continue
+            field = fields[name]
+            nested = getattr(field, 'child', field)
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if sparse[name] or name in expand:
+                if isinstance(nested, SparseFieldsMixin):
+                    nested.sparse_fields = sparse[name] or None
+                    nested.expand_fields = expand.get(name)
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, many=nested is not field, source=field.source
+                )
+        return fields
+
+
+def related_lookups(serializer):
+    """
+    Пути связей для select_related и prefetch_related, которые нужны полям сериализатора.
+    Всё, что лежит под связью "ко многим", подгружается через prefetch_related.
+    """
+    select, prefetch = [], []
+
+    def walk(serializer, prefix, many):
+        for field in serializer.fields.values():
+            nested = getattr(field, 'child', field)
+            if isinstance(field, serializers.ManyRelatedField):
+                prefetch.append(prefix + field.source.replace('.', '__'))
+            if not isinstance(nested, serializers.BaseSerializer) or field.source == '*':
+                continue
+            lookup = prefix + field.source.replace('.', '__')
+            nested_many = many or nested is not field
+            (prefetch if nested_many else select).append(lookup)
+            walk(nested, lookup + '__', nested_many)
+
+    walk(serializer, '', False)
+    return select, prefetch
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Сериализатор для вывода данных пользователя.
     """
-    avatar = VersatileImageFieldSerializer(sizes=[
-        ('full_size', 'url'),
-        ('medium', 'crop__400x400'),
-        ('small', 'thumbnail__100x100'),
-    ])
+    avatar = VersatileImageFieldSerializer(sizes='image_sizes')
 
     class Meta:
         model = CustomUser
@@ -75,7 +156,7 @@ class LoginSerializer(serializers.Serializer):
             'access': str(refresh.access_token),
         }
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для категорий товаров.
     """
@@ -83,23 +164,19 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = "__all__"
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для товаров.
     Включает вложенную категорию и обработку изображений.
     """
     category = CategorySerializer(read_only=True)
-    image = VersatileImageFieldSerializer(sizes=[
-        ('full_size', 'url'),
-        ('medium', 'crop__400x400'),
-        ('small', 'thumbnail__100x100'),
-    ])  # Добавляем обработку изображений
+    image = VersatileImageFieldSerializer(sizes='image_sizes')  # Добавляем обработку изображений
 
     class Meta:
         model = Product
         fields = '__all__'
 
-class ProductInfoSerializer(serializers.ModelSerializer):
+class ProductInfoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для подробной информации о товаре.
     Включает вложенный продукт.
@@ -108,9 +185,19 @@ class ProductInfoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProductInfo
-        exclude = ('external_id', )
+        exclude = ('external_id', 'shop_active')
+
+class ProductOfferSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Сериализатор предложения магазина для сравнения цен на товар.
+    """
+    shop_name = serializers.CharField(source='shop.name', read_only=True)
+
+    class Meta:
+        model = ProductInfo
+        fields = ['id', 'product', 'shop', 'shop_name', 'model', 'price', 'quantity']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для элементов заказа.
     Включает подробную информацию о продукте.
@@ -121,7 +208,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = '__all__'
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для заказов.
     Включает список позиций заказа и общую сумму.
@@ -138,7 +225,7 @@ class OrderSerializer(serializers.ModelSerializer):
         validated_data['user'] = user
         return super().create(validated_data)
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для товаров в корзине.
     Включает информацию о продукте.
@@ -156,7 +243,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product_id', 'product_name', 'category_name', 'model', 'price', 'quantity_available', 'shop', 'quantity']
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для корзины пользователя.
     Включает товары в корзине.
@@ -186,6 +273,14 @@ class ImportFileSerializer(serializers.Serializer):
     """
     file = FileField(use_url=True)
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для статуса и прогресса импорта прайса.
+    """
+    class Meta:
+        model = ImportJob
+        exclude = ('user',)
+
 class ContactSerializer(serializers.ModelSerializer):
     """
     Сериализатор для контактных данных пользователя.
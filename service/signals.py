@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import CustomUser, Cart
+from django.utils import timezone
+from .models import CustomUser, Cart, Category, Product, ProductInfo, DeletedOffer, Shop
+from .tasks import async_warm_product_image
+from .facets import schedule_catalog_refresh, start_catalog_batch, finish_catalog_batch
+from .catalog_cache import bump_catalog_version
 
 @receiver(post_save, sender=CustomUser)
 def create_cart(sender, instance, created, **kwargs):
@@ -8,4 +13,168 @@ def create_cart(sender, instance, created, **kwargs):
     Создаёт корзину для пользователя при его регистрации.
     """
     if created:
-        Cart.objects.create(user=instance)
\ No newline at end of file
+        Cart.objects.create(user=instance)
+
+
+@receiver(post_delete, sender=ProductInfo)
+def record_deleted_offer(sender, instance, **kwargs):
+    """
+    Запоминает удалённое предложение для инкрементального экспорта.
+    """
+    DeletedOffer.objects.create(product_id=instance.product_id, shop=instance.shop.name)
+
+
+@receiver(pre_save, sender=ProductInfo)
+def remember_offer_product(sender, instance, **kwargs):
+    """
+    Запоминает прежние товар и магазин предложения, чтобы при их смене пересчитать и прежний товар.
+    """
+    instance._previous_pair = (
+        ProductInfo.objects.filter(pk=instance.pk).values_list('product_id', 'shop_id').first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=ProductInfo)
+@receiver(post_delete, sender=ProductInfo)
+def refresh_product_aggregates(sender, instance, **kwargs):
+    """
+    Пересчитывает цены и остатки товара и счётчики фасетов его категории после изменения предложения.
+    Счётчики меняются на разницу, а при каскадном удалении пересчёт выполняется один раз на пакет.
+    """
+    offers = {(instance.product_id, instance.shop_id)}
+    if getattr(instance, '_previous_pair', None):
+        offers.add(instance._previous_pair)
+    schedule_catalog_refresh(offers=offers)
+
+
+@receiver(pre_delete, sender=Shop)
+@receiver(pre_delete, sender=Product)
+def start_cascade_refresh(sender, instance, **kwargs):
+    """
+    Начинает пакетный пересчёт перед удалением: каскадно удаляемые предложения не пересчитываются по одному.
+    """
+    start_catalog_batch()
+
+
+@receiver(post_delete, sender=Shop)
+def finish_cascade_refresh(sender, instance, **kwargs):
+    """
+    Пересчитывает сводку и фасеты один раз после каскадного удаления.
+    """
+    finish_catalog_batch()
+
+
+@receiver(pre_save, sender=Shop)
+def remember_shop_state(sender, instance, **kwargs):
+    """
+    Запоминает прежние название и активность магазина, чтобы обновлять предложения только при их смене.
+    """
+    previous = Shop.objects.filter(pk=instance.pk).values_list('name', 'state').first() if instance.pk else None
+    instance._previous_name, instance._previous_state = previous or (None, None)
+
+
+@receiver(post_save, sender=Shop)
+def touch_shop_offers(sender, instance, created, **kwargs):
+    """
+    Название магазина выгружается в строках экспорта. При переименовании сдвигается метка изменения
+    его предложений: меняется версия каталога для экспорта, а предложения попадают в delta.
+    """
+    if not created and instance.name != getattr(instance, '_previous_name', instance.name):
+        ProductInfo.objects.filter(shop=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Shop)
+def refresh_shop_products(sender, instance, created, **kwargs):
+    """
+    Пересчитывает сводку товаров магазина при смене его активности: в неё входят только предложения
+    активных магазинов. Флаг всех предложений магазина обновляется одним UPDATE.
+    Прочие изменения магазина (например, название) только меняют версию каталога.
+    """
+    if created:
+        return
+    state = Shop._meta.get_field('state').to_python(instance.state)
+    if state != getattr(instance, '_previous_state', state):
+        ProductInfo.objects.filter(shop=instance).update(shop_active=state)
+        schedule_catalog_refresh(offers=ProductInfo.objects.filter(shop=instance).values_list('product_id', 'shop_id'))
+    else:
+        bump_catalog_version()
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    """
+    Запоминает прежние название и категорию товара, чтобы пересчитать фасеты прежней категории
+    и сбросить отпечатки предложений только при их смене.
+    """
+    previous = Product.objects.filter(pk=instance.pk).values_list('name', 'category_id').first() if instance.pk else None
+    instance._previous_name, instance._previous_category_id = previous or (None, None)
+
+
+@receiver(post_save, sender=Product)
+def reset_offer_fingerprints(sender, instance, created, **kwargs):
+    """
+    Название и категория товара входят в отпечаток его предложений. При их смене отпечатки
+    сбрасываются, чтобы следующий импорт перезаписал строки прайса.
+    """
+    previous = (getattr(instance, '_previous_name', None), getattr(instance, '_previous_category_id', None))
+    if not created and previous != (None, None) and previous != (instance.name, instance.category_id):
+        instance.infos.exclude(fingerprint='').update(fingerprint='')
+
+
+@receiver(post_save, sender=Product)
+def refresh_category_facets(sender, instance, created, **kwargs):
+    """
+    Пересчитывает счётчики фасетов прежней и новой категорий при смене категории товара.
+    Прочие изменения товара только меняют версии каталога его категории и его самого.
+    """
+    previous = getattr(instance, '_previous_category_id', None)
+    if not created and previous not in (None, instance.category_id):
+        schedule_catalog_refresh(categories={previous, instance.category_id})
+    else:
+        bump_catalog_version(categories={instance.category_id}, products={instance.pk})
+
+
+@receiver(post_delete, sender=Product)
+def refresh_deleted_product_category(sender, instance, **kwargs):
+    """
+    Пересчитывает счётчики фасетов категории удалённого товара, один раз на пакет удаления.
+    """
+    finish_catalog_batch(categories={instance.category_id})
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_name(sender, instance, **kwargs):
+    """
+    Запоминает прежнее название категории, чтобы обновлять предложения только при его смене.
+    """
+    instance._previous_name = (
+        Category.objects.filter(pk=instance.pk).values_list('name', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Category)
+def touch_category_offers(sender, instance, created, **kwargs):
+    """
+    Название категории выгружается в строках экспорта её товаров, поэтому при переименовании
+    метка изменения их предложений сдвигается так же, как при переименовании магазина.
+    """
+    if not created and instance.name != getattr(instance, '_previous_name', instance.name):
+        ProductInfo.objects.filter(product__category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """
+    Название категории входит в ответ каталога, поэтому её изменение меняет версию каталога.
+    """
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def warm_product_image(sender, instance, **kwargs):
+    """
+    Ставит в очередь нарезку размеров изображения товара после фиксации транзакции.
+    """
+    if instance.image:
+        transaction.on_commit(lambda: async_warm_product_image.delay(instance.pk))
@@ -1,23 +1,32 @@
 import datetime
+import io
 import os
 import time
 import traceback
+from contextlib import nullcontext
+from functools import partial
 import ssl
 from smtplib import SMTPException
-import yaml
-from celery import shared_task
+from celery import shared_task, chord
+from versatileimagefield.image_warmer import VersatileImageFieldWarmer
 from django.contrib.auth import models
 from django.contrib.auth.models import User
 from django.contrib.sites import requests
 from django.core.mail import send_mail, EmailMultiAlternatives, EmailMessage
 from django.conf import settings
+from django.core.cache import cache
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.html import strip_tags
 from django.core.mail.backends.smtp import EmailBackend
 from django.utils.http import urlsafe_base64_encode
-import pandas as pd
-from .models import Product, ProductInfo, Shop, Category, Order, CustomUser
+from .models import Product, Order, CustomUser, ImportJob, ProductExport
+from .importers import ProductImporter, collect_references
+from .exporters import EXPORT_FORMATS, DELTA_FIELDS, export_products, iter_delta_rows, manifest_path, \
+    write_manifest, export_path, catalog_version, export_lock_key, prune_exports
+from .readers import iter_goods, iter_yaml_goods, iter_jsonl_goods, InvalidPriceList
+from .uploads import open_upload, remove_upload, write_shards, file_checksum
 import logging
 
 logger = logging.getLogger(__name__)
@@ -72,95 +81,226 @@ def async_send_order_confirmation(order_id):
         logger.exception(f"Ошибка при отправке письма подтверждения: {exc}")
 
 
-@shared_task(name="async_import_products")
-def async_import_products(file_data, user_id):
+def _run_import(source, reader, job_id=None, offset=0):
     """
-    Задача импортирует товары из YAML-файла.
+    Импортирует товары из открываемого источника и возвращает результат задачи.
+    Прогресс по каждому записанному пакету сохраняется в ImportJob.
+    offset - число строк файла перед источником, чтобы отчёт об ошибках ссылался на строки файла.
     """
+    importer = ProductImporter(progress=partial(ImportJob.add_progress, job_id) if job_id else None, offset=offset)
     try:
-        if isinstance(file_data, bytes):
-            file_data = file_data.decode('utf-8')
-
-        data = yaml.safe_load(file_data)
-
-        if 'goods' not in data:
-            logger.error("YAML-файл имеет неверную структуру")
-            return {'result': 'INVALID_YAML_STRUCTURE'}
-
-        shops_map = {}
-        categories_map = {}
-
-        existing_shops = {shop.name: shop for shop in Shop.objects.all()}
-        existing_categories = {cat.name: cat for cat in Category.objects.all()}
-
-        for item in data['goods']:
-            shop_name = item.get('shop', '')
-            if shop_name not in shops_map:
-                shop = existing_shops.get(shop_name)
-                if not shop:
-                    shop = Shop.objects.create(name=shop_name)
-                shops_map[shop_name] = shop
-
-            category_name = item.get('category', '')
-            if category_name not in categories_map:
-                category = existing_categories.get(category_name)
-                if not category:
-                    category = Category.objects.create(name=category_name)
-                categories_map[category_name] = category
-
-            product, created = Product.objects.get_or_create(id=item['id'], defaults={'name': item['name'],
-                                                                                      'category': categories_map[
-                                                                                          category_name]})
-
-            ProductInfo.objects.update_or_create(
-                product=product,
-                defaults={
-                    'model': item.get('model', ''),
-                    'price': float(item.get('price', 0)),
-                    'quantity': int(item.get('quantity', 0)),
-                    'shop': shops_map[shop_name],
-                },
-            )
-
-        return {'result': 'IMPORT_SUCCESSFUL'}
+        with source as stream:
+            stats = importer.run(reader(stream))
+        logger.info(f"Импорт завершён: создано {stats['created']}, обновлено {stats['updated']}, "
+                    f"без изменений {stats['unchanged']}, отклонено {stats['failed']}")
+        result = {'result': 'IMPORT_SUCCESSFUL', **stats}
+    except InvalidPriceList as e:
+        logger.error(f"Файл прайса имеет неверную структуру: {e}")
+        result = {'result': 'INVALID_YAML_STRUCTURE'}
     except Exception as e:
         logger.error(f"Ошибка при загрузке файла: {e}")
+        result = {'result': f'LOADING_ERROR: {str(e)}'}
+    result['rows'] = importer.rows
+    result['rejected'] = importer.rejected
+    result['timings'] = {phase: round(seconds, 3) for phase, seconds in importer.timings.items()}
+    return result
+
+
+def _split_import(upload):
+    """
+    Раскладывает прайс по шардам и заранее создаёт магазины и категории.
+    Возвращает дескрипторы шардов либо результат задачи с ошибкой.
+    """
+    shops, categories = set(), set()
+    try:
+        with open_upload(upload) as stream:
+            shards = write_shards(collect_references(iter_goods(stream, upload['name']), shops, categories),
+                                  settings.IMPORT_SHARD_SIZE)
+        ProductImporter().create_references(shops, categories)
+        return shards
+    except InvalidPriceList as e:
+        logger.error(f"Файл прайса имеет неверную структуру: {e}")
+        return {'result': 'INVALID_YAML_STRUCTURE'}
+    except Exception as e:
+        logger.error(f"Ошибка при разбиении файла на шарды: {e}")
         return {'result': f'LOADING_ERROR: {str(e)}'}
 
 
-@shared_task(name="async_export_products")
-def async_export_products():
+@shared_task(name="async_import_products", bind=True)
+def async_import_products(self, upload, user_id, job_id=None):
     """
-    Задача экспортирует товары в YAML.
+    Задача импортирует товары из файла прайса (YAML, CSV, JSON Lines или XLSX).
+    Получает дескриптор сохранённого файла, файл разбирается потоково,
+    товары передаются в запись пакетами.
+    Крупные прайсы делятся на шарды, которые импортируются параллельно,
+    а общий отчёт собирает задача async_import_report.
     """
-    products = ProductInfo.objects.values(
-        'product__name', 'model', 'price', 'quantity', 'shop__name', 'product__category__name'
-    )
+    ImportJob.start(job_id)
+    if not isinstance(upload, dict):
+        # Совместимость с задачами, поставленными в очередь с содержимым файла
+        data = upload.encode('utf-8') if isinstance(upload, str) else upload
+        return _run_import(nullcontext(io.BytesIO(data)), iter_yaml_goods)
+
+    try:
+        if upload['size'] < settings.IMPORT_SHARD_THRESHOLD:
+            result = _run_import(open_upload(upload), partial(iter_goods, name=upload['name']), job_id)
+            ImportJob.finish(job_id, result, rows_total=result['rows'], timings=result['timings'],
+                             errors=result['rejected'])
+            return result
+        started = time.monotonic()
+        shards = _split_import(upload)
+        split_timings = {'split': round(time.monotonic() - started, 3)}
+    finally:
+        remove_upload(upload)
+
+    if isinstance(shards, dict):
+        ImportJob.finish(job_id, shards, timings=split_timings)
+        return shards
+    if job_id:
+        ImportJob.objects.filter(pk=job_id).update(rows_total=sum(shard['rows'] for shard in shards))
+    if len(shards) <= 1:
+        return async_import_report([async_import_shard(shard, job_id) for shard in shards], job_id, split_timings)
+    logger.info(f"Прайс разбит на {len(shards)} шардов")
+    report = async_import_report.s(job_id, split_timings)
+    # Если упадёт шард или сам отчёт (например, будет потерян воркер), отчёт не выполнится.
+    # Celery вызывает обработчики ошибок тела chord и при сбое шарда, он и завершает задачу импорта
+    report.link_error(async_import_failed.s(job_id))
+    return self.replace(chord([async_import_shard.s(shard, job_id) for shard in shards], report))
+
+
+@shared_task(name="async_import_shard")
+def async_import_shard(shard, job_id=None):
+    """
+    Задача импортирует один шард прайса в формате JSON Lines.
+    """
+    try:
+        return _run_import(open_upload(shard), iter_jsonl_goods, job_id, shard.get('offset', 0))
+    finally:
+        remove_upload(shard)
 
-    goods = []
-    for product in products:
-        goods.append({
-            'name': product['product__name'],
-            'model': product['model'],
-            'price': product['price'],
-            'quantity': product['quantity'],
-            'shop': product['shop__name'],
-            'category': product['product__category__name']
-        })
 
-    export_data = {
-        'shops': [],
-        'categories': [],
-        'goods': goods
+@shared_task(name="async_import_report")
+def async_import_report(results, job_id=None, timings=None):
+    """
+    Задача объединяет результаты шардов импорта в общий отчёт.
+    """
+    report = {
+        'result': 'IMPORT_SUCCESSFUL', 'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0,
+        'shards': len(results), 'rows': 0, 'rejected': [], 'timings': dict(timings or {}),
+    }
+    errors = []
+    for result in results:
+        for key in ('created', 'updated', 'unchanged', 'failed', 'rows'):
+            report[key] += result.get(key, 0)
+        report['rejected'].extend(result.get('rejected', []))
+        for phase, seconds in result.get('timings', {}).items():
+            report['timings'][phase] = round(report['timings'].get(phase, 0) + seconds, 3)
+        if result['result'] != 'IMPORT_SUCCESSFUL':
+            errors.append({'error': result['result']})
+            if report['result'] == 'IMPORT_SUCCESSFUL':
+                report['result'] = result['result']
+    report['rejected'] = report['rejected'][:ImportJob.ERRORS_SAMPLE_SIZE]
+    ImportJob.finish(job_id, report, rows_total=report['rows'], timings=report['timings'],
+                     errors=errors + report['rejected'])
+    return report
+
+
+@shared_task(name="async_import_failed")
+def async_import_failed(request, exc, traceback, job_id=None):
+    """
+    Обработчик ошибки шардированного импорта: отмечает задачу импорта завершённой с ошибкой.
+    """
+    logger.error(f"Импорт по шардам прерван задачей {request.id}: {exc!r}")
+    ImportJob.finish(job_id, {'result': f'LOADING_ERROR: {exc!r}'})
+
+
+def _export_result(export, seconds, reused=False):
+    return {
+        "result": "EXPORT_SUCCESSFUL",
+        "export_id": export.id,
+        "filename": export.filename,
+        "manifest": os.path.basename(manifest_path(export.filename)),
+        "kind": export.kind,
+        "format": export.format,
+        "rows": export.rows,
+        "size": export.size,
+        "catalog_version": export.catalog_version,
+        "reused": reused,
+        "seconds": seconds,
     }
 
-    current_time = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    filename = f"export{current_time}.yaml"
 
-    with open(os.path.join(settings.EXPORT_DIR, filename), 'w') as outfile:
-        yaml.dump(export_data, outfile, allow_unicode=True)
+@shared_task(name="async_export_products", bind=True)
+def async_export_products(self, export_format='yaml', kind='full'):
+    """
+    Задача экспортирует товары в выбранном формате: yaml, csv.gz, jsonl или parquet.
+    При kind='delta' выгружаются только изменения с предыдущего экспорта в этом формате,
+    а если экспортов ещё не было - весь каталог.
+    Если каталог не менялся, новый файл не создаётся и возвращается существующий.
+    Предложения читаются из базы и пишутся в файл пакетами, память не зависит от размера каталога.
+    """
+    if export_format not in EXPORT_FORMATS:
+        return {"result": "UNSUPPORTED_FORMAT", "format": export_format}
 
-    return {"result": "EXPORT_SUCCESSFUL", "filename": filename}
+    try:
+        return _export_products(export_format, kind)
+    finally:
+        # Снимаем блокировку, только если её поставил запуск этой задачи
+        lock_key = export_lock_key(export_format, kind)
+        if self.request.id and cache.get(lock_key) == self.request.id:
+            cache.delete(lock_key)
+
+
+def _export_products(export_format, kind):
+    started = time.perf_counter()
+    # Версия и метка фиксируются до чтения каталога: изменения, сделанные во время выгрузки,
+    # попадут и в следующий файл
+    version = catalog_version()
+    high_water_mark = timezone.now()
+
+    previous = ProductExport.objects.filter(format=export_format).first()
+    if kind != 'delta' or previous is None:
+        kind, previous = 'full', None
+        existing = ProductExport.objects.filter(format=export_format, kind='full', catalog_version=version).first()
+    else:
+        # Изменений с предыдущего экспорта нет - он и есть актуальный
+        existing = previous if previous.catalog_version == version else None
+    if existing and os.path.exists(export_path(existing.filename)):
+        return _export_result(existing, round(time.perf_counter() - started, 3), reused=True)
+
+    current_time = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')
+    suffix = '-delta' if kind == 'delta' else ''
+    filename = f"export{current_time}{suffix}{EXPORT_FORMATS[export_format][1]}"
+    path = export_path(filename)
+
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    if previous:
+        # Перекрытие окна подхватывает строки, метка которых раньше метки предыдущего экспорта,
+        # но транзакция зафиксирована уже после него. Повтор строки в delta безопасен
+        since = previous.high_water_mark - datetime.timedelta(seconds=settings.EXPORT_DELTA_OVERLAP)
+        rows = export_products(path, export_format, iter_delta_rows(since), DELTA_FIELDS)
+    else:
+        rows = export_products(path, export_format)
+
+    export = ProductExport.objects.create(
+        kind=kind,
+        format=export_format,
+        filename=filename,
+        rows=rows,
+        size=os.path.getsize(path),
+        checksum=file_checksum(path),
+        since=previous.high_water_mark if previous else None,
+        high_water_mark=high_water_mark,
+        catalog_version=version,
+        base=(previous.base or previous) if previous else None,
+        previous=previous,
+    )
+    write_manifest(path, export.manifest())
+    pruned = prune_exports(export_format)
+    if pruned:
+        logger.info(f"Удалено устаревших экспортов: {pruned}")
+
+    return _export_result(export, round(time.perf_counter() - started, 3))
 
 
 @shared_task(name="send_password_reset_email")
@@ -285,4 +425,19 @@ def send_registration_confirmation_email(user_id):
         )
 
     except CustomUser.DoesNotExist:
-        pass
\ No newline at end of file
+        pass
+
+@shared_task(name="async_warm_product_image")
+def async_warm_product_image(product_id):
+    """
+    Задача заранее создаёт уменьшенные копии изображения товара,
+    чтобы каталог не нарезал их при первом запросе.
+    """
+    product = Product.objects.filter(pk=product_id).first()
+    if not product or not product.image:
+        return
+    warmer = VersatileImageFieldWarmer(instance_or_queryset=product, rendition_key_set='image_sizes',
+                                       image_attr='image')
+    num_created, failed_to_create = warmer.warm()
+    if failed_to_create:
+        logger.warning(f"Не удалось создать размеры изображения товара {product_id}: {failed_to_create}")
@@ -0,0 +1,98 @@
+import json
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework import status
+from service.catalog_cache import LIST_SCOPE, catalog_version
+from service.importers import ProductImporter
+from service.models import Category, Product, ProductInfo, Shop
+from service.views import ProductsListView
+
+
+@override_settings(CACHALOT_ENABLED=False)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.view = ProductsListView.as_view()
+        self.category = Category.objects.create(name='Смартфоны')
+        self.shop = Shop.objects.create(name='Связной')
+        self.product = Product.objects.create(name='Смартфон', category=self.category)
+        self.offer = ProductInfo.objects.create(product=self.product, shop=self.shop, model='A',
+                                                price=Decimal('900'), quantity=1)
+
+    def get(self, url='/api/v1/products/', **headers):
+        return self.view(self.factory.get(url, headers=headers))
+
+    def test_repeated_request_served_from_cache(self):
+        """Тест на выдачу повторного запроса из кеша без обращений к базе"""
+        first = self.get('/api/v1/products/?page_size=10&ordering=id')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(first.content)['results'][0]['name'], 'Смартфон')
+        with CaptureQueriesContext(connection) as queries:
+            # Порядок параметров не влияет на ключ кеша
+            second = self.get('/api/v1/products/?ordering=id&page_size=10')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_conditional_requests(self):
+        """Тест на ответ 304 по If-None-Match и If-Modified-Since"""
+        response = self.get()
+        self.assertEqual(self.get(**{'If-None-Match': response['ETag']}).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.get(**{'If-Modified-Since': response['Last-Modified']}).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.get(**{'If-None-Match': '"other"'}).status_code, status.HTTP_200_OK)
+
+    def test_offer_update_invalidates_cache(self):
+        """Тест на сброс кеша после фиксации изменения предложения"""
+        response = self.get()
+        version = catalog_version(LIST_SCOPE)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.offer.price = Decimal('500')
+            self.offer.save()
+        # До фиксации транзакции версия каталога не меняется
+        self.assertEqual(catalog_version(LIST_SCOPE), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(catalog_version(LIST_SCOPE), version)
+
+        updated = self.get(**{'If-None-Match': response['ETag']})
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(updated.content)['results'][0]['min_price'], '500.00')
+
+    def test_offer_update_keeps_other_categories_cached(self):
+        """Тест на сброс кеша только у страниц категории изменённого предложения"""
+        laptops = Category.objects.create(name='Ноутбуки')
+        laptop = Product.objects.create(name='Ноутбук', category=laptops)
+        ProductInfo.objects.create(product=laptop, shop=self.shop, model='B', price=Decimal('60000'), quantity=1)
+        phones_url, laptops_url = f'/api/v1/products/?category={self.category.id}', f'/api/v1/products/?category={laptops.id}'
+        phones, laptops_page = self.get(phones_url), self.get(laptops_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.price = Decimal('500')
+            self.offer.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(laptops_url).content, laptops_page.content)
+        self.assertEqual(len(queries), 0)
+        updated = self.get(phones_url, **{'If-None-Match': phones['ETag']})
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(updated.content)['results'][0]['min_price'], '500.00')
+
+        # Товар без предложений меняет счётчики категорий, которые есть на странице любой категории
+        with self.captureOnCommitCallbacks(execute=True):
+            self.offer.delete()
+        self.assertNotEqual(self.get(laptops_url).content, laptops_page.content)
+
+    def test_import_invalidates_cache(self):
+        """Тест на сброс кеша после импорта"""
+        response = self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImporter().run([{'id': 500, 'name': 'Планшет', 'category': 'Планшеты', 'shop': 'Связной',
+                                    'model': 'C', 'price': 2000, 'quantity': 3}])
+        updated = self.get()
+        self.assertNotEqual(updated['ETag'], response['ETag'])
+        self.assertEqual(len(json.loads(updated.content)['results']), 2)
@@ -0,0 +1,120 @@
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework import status
+from service.facets import catalog_facets
+from service.importers import ProductImporter
+from service.models import CatalogFacet, Category, Product, ProductInfo, Shop
+from service.views import ProductsListView
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0, CATALOG_PRICE_BANDS=[0, 1000, 5000])
+class CatalogFacetsTests(TestCase):
+    def setUp(self):
+        self.phones = Category.objects.create(name='Смартфоны')
+        self.laptops = Category.objects.create(name='Ноутбуки')
+        self.shop = Shop.objects.create(name='Связной')
+        self.phone = Product.objects.create(name='Смартфон', category=self.phones)
+        self.laptop = Product.objects.create(name='Ноутбук', category=self.laptops)
+        ProductInfo.objects.create(product=self.phone, shop=self.shop, model='A', price=Decimal('900'), quantity=1)
+        ProductInfo.objects.create(product=self.laptop, shop=self.shop, model='B', price=Decimal('60000'), quantity=1)
+
+    def test_facets_follow_offer_writes(self):
+        """Тест на пересчёт фасетов при изменении предложений и товаров"""
+        facets = catalog_facets()
+        self.assertEqual([(item['name'], item['count']) for item in facets['categories']],
+                         [('Ноутбуки', 1), ('Смартфоны', 1)])
+        self.assertEqual(facets['shops'], [{'id': self.shop.id, 'name': 'Связной', 'count': 2}])
+        self.assertEqual(facets['price'], [{'from': 0, 'to': 1000, 'count': 1}, {'from': 5000, 'to': None, 'count': 1}])
+
+        self.laptop.category = self.phones
+        self.laptop.save()
+        facets = catalog_facets(self.phones.id)
+        self.assertEqual([(item['name'], item['count']) for item in facets['categories']], [('Смартфоны', 2)])
+        self.assertEqual(facets['shops'][0]['count'], 2)
+
+    def test_offer_write_updates_only_affected_rows(self):
+        """Тест на изменение счётчиков фасетов на разницу без пересоздания строк категории"""
+        other = Shop.objects.create(name='Эльдорадо')
+        rows = set(CatalogFacet.objects.filter(category=self.phones, dimension='category').values_list('id', flat=True))
+        offer = ProductInfo.objects.create(product=self.phone, shop=other, model='C', price=Decimal('2000'), quantity=1)
+        self.assertEqual(set(CatalogFacet.objects.filter(category=self.phones, dimension='category')
+                             .values_list('id', flat=True)), rows)
+        facets = catalog_facets(self.phones.id)
+        self.assertEqual([(item['name'], item['count']) for item in facets['shops']],
+                         [('Связной', 1), ('Эльдорадо', 1)])
+        self.assertEqual(facets['price'], [{'from': 0, 'to': 1000, 'count': 1}])
+
+        ProductInfo.objects.filter(product=self.phone, shop=self.shop).delete()
+        facets = catalog_facets(self.phones.id)
+        self.assertEqual(facets['shops'], [{'id': other.id, 'name': 'Эльдорадо', 'count': 1}])
+        self.assertEqual(facets['price'], [{'from': 1000, 'to': 5000, 'count': 1}])
+
+        offer.delete()
+        facets = catalog_facets(self.phones.id)
+        self.assertEqual([(item['name'], item['count']) for item in facets['categories']], [('Ноутбуки', 1)])
+        self.assertEqual((facets['shops'], facets['price']), ([], []))
+        self.assertFalse(CatalogFacet.objects.filter(count=0).exists())
+
+    def test_cascade_delete_refreshes_once(self):
+        """Тест на однократный пересчёт фасетов при каскадном удалении магазина и товаров"""
+        for number in range(5):
+            product = Product.objects.create(name=f'Смартфон {number}', category=self.phones)
+            ProductInfo.objects.create(product=product, shop=self.shop, model='C', price=Decimal('100'), quantity=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                self.shop.delete()
+        # Сводка товаров пересчитывается одним UPDATE на все каскадно удалённые предложения
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "service_product"')]), 1)
+        self.assertEqual(Product.objects.filter(offers_count__gt=0).count(), 0)
+        facets = catalog_facets()
+        self.assertEqual((facets['categories'], facets['shops'], facets['price']), ([], [], []))
+
+        other = Shop.objects.create(name='Эльдорадо')
+        for product in Product.objects.all():
+            ProductInfo.objects.create(product=product, shop=other, model='D', price=Decimal('2000'), quantity=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                Product.objects.filter(category=self.phones).delete()
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('DELETE FROM "service_catalogfacet"')]), 1)
+        facets = catalog_facets()
+        self.assertEqual([(item['name'], item['count']) for item in facets['categories']], [('Ноутбуки', 1)])
+        self.assertEqual(facets['shops'], [{'id': other.id, 'name': 'Эльдорадо', 'count': 1}])
+
+    def test_facets_are_aggregated_in_one_query(self):
+        """Тест на отбор и суммирование фасетов в базе одним запросом"""
+        other = Shop.objects.create(name='Эльдорадо')
+        ProductInfo.objects.create(product=self.phone, shop=other, model='C', price=Decimal('800'), quantity=1)
+        with self.assertNumQueries(1):
+            facets = catalog_facets()
+        self.assertEqual([(item['name'], item['count']) for item in facets['shops']],
+                         [('Связной', 2), ('Эльдорадо', 1)])
+        with self.assertNumQueries(1):
+            facets = catalog_facets(self.laptops.id)
+        self.assertEqual(len(facets['categories']), 2)
+        self.assertEqual([(item['name'], item['count']) for item in facets['shops']], [('Связной', 1)])
+        self.assertEqual(facets['price'], [{'from': 5000, 'to': None, 'count': 1}])
+
+    def test_import_refreshes_facets(self):
+        """Тест на пересчёт фасетов после импорта"""
+        ProductImporter().run([{'id': 500, 'name': 'Планшет', 'category': 'Планшеты', 'shop': 'Связной',
+                                'model': 'C', 'price': 2000, 'quantity': 3}])
+        facets = catalog_facets(Category.objects.get(name='Планшеты').id)
+        self.assertIn(('Планшеты', 1), [(item['name'], item['count']) for item in facets['categories']])
+        self.assertEqual(facets['price'], [{'from': 1000, 'to': 5000, 'count': 1}])
+
+    def test_catalog_response_contains_facets(self):
+        """Тест на выдачу фасетов вместе со страницей каталога"""
+        view = ProductsListView.as_view()
+        response = view(APIRequestFactory().get(f'/api/v1/products/?category={self.phones.id}'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['facets']['price'], [{'from': 0, 'to': 1000, 'count': 1}])
+
+    def test_refresh_command(self):
+        """Тест на полный пересчёт фасетов командой"""
+        CatalogFacet.objects.all().delete()
+        call_command('refresh_catalog_facets', stdout=open('/dev/null', 'w'))
+        self.assertEqual(len(catalog_facets()['categories']), 2)
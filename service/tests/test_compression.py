@@ -0,0 +1,74 @@
+import gzip
+import json
+from unittest import skipIf
+from unittest.mock import patch
+from decimal import Decimal
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from service import middleware
+from service.middleware import CompressionMiddleware, negotiate_encoding
+from service.models import Category, Product, ProductInfo, Shop
+
+PAYLOAD = json.dumps([{'id': number, 'name': 'Смартфон'} for number in range(100)]).encode('utf-8')
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def process(self, accept_encoding='gzip', method='get', content=PAYLOAD, content_type='application/json', **headers):
+        request = getattr(RequestFactory(), method)('/api/v1/products/', headers={'Accept-Encoding': accept_encoding})
+        response = HttpResponse(content, content_type=content_type, headers=headers)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiate_encoding(self):
+        """Тест на выбор кодировки по Accept-Encoding с учётом весов"""
+        with patch.object(middleware, 'available_encodings', return_value=('br', 'gzip')):
+            self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'br')
+            self.assertEqual(negotiate_encoding('gzip;q=1.0, br;q=0.5'), 'gzip')
+            self.assertEqual(negotiate_encoding('br;q=0, *'), 'gzip')
+            self.assertIsNone(negotiate_encoding('identity'))
+            self.assertIsNone(negotiate_encoding(''))
+
+    def test_gzip(self):
+        """Тест на сжатие ответа gzip"""
+        response = self.process(ETag='"abc"')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(gzip.decompress(response.content), PAYLOAD)
+
+    @skipIf(middleware.brotli is None, 'Пакет brotli не установлен')
+    def test_brotli(self):
+        """Тест на сжатие ответа brotli"""
+        response = self.process('gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), PAYLOAD)
+
+    def test_not_compressed(self):
+        """Тест на ответы, которые не сжимаются"""
+        self.assertFalse(self.process('identity').has_header('Content-Encoding'))
+        self.assertFalse(self.process(content=b'{}').has_header('Content-Encoding'))
+        self.assertFalse(self.process(method='post').has_header('Content-Encoding'))
+        self.assertFalse(self.process(content_type='text/html; charset=utf-8').has_header('Content-Encoding'))
+
+
+@override_settings(CACHALOT_ENABLED=False)
+class PrecompressedCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Смартфоны')
+        shop = Shop.objects.create(name='Связной')
+        for number in range(10):
+            product = Product.objects.create(name=f'Смартфон {number}', category=category)
+            ProductInfo.objects.create(product=product, shop=shop, model='A', price=Decimal('900'), quantity=1)
+
+    def test_catalog_compressed_once(self):
+        """Тест на выдачу закешированной страницы каталога без повторного сжатия"""
+        first = self.client.get('/api/v1/products/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        with patch.object(middleware, 'compress', side_effect=AssertionError('сжатие при выдаче из кеша')):
+            second = self.client.get('/api/v1/products/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(json.loads(gzip.decompress(second.content))['results']), 10)
+
+        not_modified = self.client.get('/api/v1/products/', headers={'If-None-Match': second['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework import status
+from service.views import ExportDownloadView
+from service.models import CustomUser, ProductExport
+
+CONTENT = '{"id": 1, "name": "Товар"}\n'.encode('utf-8') * 10
+
+
+class ExportDownloadViewTests(TestCase):
+    def setUp(self):
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        settings_override = override_settings(EXPORT_DIR=export_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with open(os.path.join(export_dir.name, 'export.jsonl'), 'wb') as file:
+            file.write(CONTENT)
+
+        self.factory = APIRequestFactory()
+        self.view = ExportDownloadView.as_view()
+        self.user = CustomUser.objects.create_user(email='test@example.com', password='password', is_active=True)
+        self.export = ProductExport.objects.create(
+            format='jsonl', filename='export.jsonl', rows=10, size=len(CONTENT),
+            checksum=hashlib.sha256(CONTENT).hexdigest(), high_water_mark=timezone.now(),
+        )
+
+    def download(self, **headers):
+        request = self.factory.get(f'/api/v1/exports/{self.export.pk}/download/', **headers)
+        force_authenticate(request, user=self.user)
+        response = self.view(request, pk=self.export.pk)
+        self.addCleanup(response.close)
+        return response
+
+    def test_download(self):
+        """Тест на потоковое скачивание файла экспорта"""
+        response = self.download()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['ETag'], f'"{self.export.checksum}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_not_modified(self):
+        """Тест на ответ 304 для неизменившегося файла"""
+        response = self.download(HTTP_IF_NONE_MATCH=f'"{self.export.checksum}"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_range(self):
+        """Тест на скачивание диапазона байт"""
+        response = self.download(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+        response = self.download(HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+
+    def test_range_not_satisfiable(self):
+        """Тест на диапазон за пределами файла"""
+        response = self.download(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_invalid_range_is_ignored(self):
+        """Тест на выдачу всего файла при синтаксически неверном диапазоне"""
+        for header in ('bytes=20-10', 'bytes=a-5', 'bytes=--5'):
+            response = self.download(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_unauthenticated(self):
+        """Тест на скачивание экспорта без авторизации"""
+        request = self.factory.get(f'/api/v1/exports/{self.export.pk}/download/')
+        response = self.view(request, pk=self.export.pk)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,168 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import yaml
+from datetime import timedelta
+import pandas as pd
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from service.models import Category, Product, ProductInfo, Shop, ProductExport
+from service.readers import iter_yaml_goods
+from service.tasks import async_export_products
+
+
+class ExportProductsTaskTests(TestCase):
+    def setUp(self):
+        self.export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.export_dir.cleanup)
+        settings_override = override_settings(EXPORT_DIR=self.export_dir.name, EXPORT_CHUNK_SIZE=2,
+                                              EXPORT_DELTA_OVERLAP=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        category = Category.objects.create(name='Электроника')
+        shop = Shop.objects.create(name='Связной')
+        for number in range(1, 6):
+            product = Product.objects.create(name=f'Товар {number}', category=category)
+            ProductInfo.objects.create(product=product, shop=shop, model=f'M{number}',
+                                       price=Decimal('10.50') * number, quantity=number)
+
+    def read_export(self, filename):
+        with open(os.path.join(self.export_dir.name, filename), encoding='utf-8') as file:
+            return file.read()
+
+    def test_export_is_streamed_in_chunks(self):
+        """Тест на экспорт каталога по частям в корректный YAML"""
+        result = async_export_products()
+        self.assertEqual(result['result'], 'EXPORT_SUCCESSFUL')
+        self.assertEqual(result['rows'], 5)
+        data = yaml.safe_load(self.read_export(result['filename']))
+        self.assertEqual(list(data), ['categories', 'goods', 'shops'])
+        self.assertEqual(len(data['goods']), 5)
+        self.assertEqual(data['goods'][1]['price'], 21.0)
+
+    def test_export_can_be_imported(self):
+        """Тест на совместимость экспорта с импортом"""
+        content = self.read_export(async_export_products()['filename'])
+        goods = list(iter_yaml_goods(io.BytesIO(content.encode('utf-8'))))
+        self.assertEqual({item['id'] for item in goods}, set(Product.objects.values_list('id', flat=True)))
+
+    def test_empty_catalog(self):
+        """Тест на экспорт пустого каталога"""
+        ProductInfo.objects.all().delete()
+        data = yaml.safe_load(self.read_export(async_export_products()['filename']))
+        self.assertEqual(data['goods'], [])
+
+    def test_export_formats(self):
+        """Тест на экспорт в CSV.gz, JSON Lines и Parquet"""
+        for export_format in ('csv.gz', 'jsonl', 'parquet'):
+            result = async_export_products(export_format)
+            self.assertEqual(result['result'], 'EXPORT_SUCCESSFUL')
+            self.assertTrue(result['filename'].endswith(export_format))
+            self.assertEqual(result['rows'], 5)
+            self.assertGreater(result['size'], 0)
+            self.assertIn('seconds', result)
+
+        path = os.path.join(self.export_dir.name, async_export_products('csv.gz')['filename'])
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows[0]['name'], 'Товар 1')
+        frame = pd.read_parquet(os.path.join(self.export_dir.name, async_export_products('parquet')['filename']))
+        self.assertEqual(frame['price'].tolist(), [10.5, 21.0, 31.5, 42.0, 52.5])
+
+    def test_unsupported_format(self):
+        """Тест на неподдерживаемый формат экспорта"""
+        self.assertEqual(async_export_products('xml')['result'], 'UNSUPPORTED_FORMAT')
+
+
+    def test_delta_export(self):
+        """Тест на инкрементальный экспорт изменённых и удалённых предложений"""
+        # Каталог изменён задолго до полного экспорта
+        past = timezone.now() - timedelta(hours=1)
+        Product.objects.update(updated_at=past)
+        ProductInfo.objects.update(updated_at=past)
+        full = async_export_products('jsonl')
+        ProductInfo.objects.filter(model='M1').update(price=Decimal('99.00'), updated_at=timezone.now())
+        ProductInfo.objects.get(model='M2').delete()
+
+        result = async_export_products('jsonl', 'delta')
+        self.assertEqual(result['kind'], 'delta')
+        lines = self.read_export(result['filename']).splitlines()
+        rows = sorted((json.loads(line) for line in lines), key=lambda row: row['deleted'], reverse=True)
+        self.assertEqual([(row['id'], row['deleted']) for row in rows], [
+            (Product.objects.get(name='Товар 2').id, True),
+            (Product.objects.get(name='Товар 1').id, False),
+        ])
+        self.assertEqual(rows[1]['price'], 99.0)
+
+        manifest = json.loads(self.read_export(result['manifest']))
+        self.assertEqual(manifest['base'], full['filename'])
+        self.assertEqual(manifest['previous'], full['filename'])
+        self.assertEqual(manifest['rows'], 2)
+
+    def test_delta_export_after_rename(self):
+        """Тест на попадание предложений переименованных категории и магазина в инкрементальный экспорт"""
+        past = timezone.now() - timedelta(hours=1)
+        Product.objects.update(updated_at=past)
+        ProductInfo.objects.update(updated_at=past)
+        async_export_products('jsonl')
+        for model, name in ((Category, 'Бытовая техника'), (Shop, 'Эльдорадо')):
+            reference = model.objects.get()
+            reference.name = name
+            reference.save()
+            result = async_export_products('jsonl', 'delta')
+            self.assertFalse(result['reused'])
+            self.assertEqual(result['rows'], 5)
+        rows = [json.loads(line) for line in self.read_export(result['filename']).splitlines()]
+        self.assertEqual({(row['category'], row['shop']) for row in rows}, {('Бытовая техника', 'Эльдорадо')})
+
+    def test_first_delta_is_full(self):
+        """Тест на полный экспорт при запросе изменений без базового экспорта"""
+        result = async_export_products('jsonl', 'delta')
+        self.assertEqual(result['kind'], 'full')
+        self.assertEqual(result['rows'], 5)
+
+    def test_unchanged_catalog_reuses_export(self):
+        """Тест на повторное использование экспорта неизменившегося каталога"""
+        first = async_export_products('jsonl')
+        second = async_export_products('jsonl')
+        self.assertTrue(second['reused'])
+        self.assertEqual(second['filename'], first['filename'])
+        self.assertEqual(async_export_products('jsonl', 'delta')['export_id'], first['export_id'])
+
+        ProductInfo.objects.filter(model='M1').update(quantity=100, updated_at=timezone.now())
+        third = async_export_products('jsonl')
+        self.assertFalse(third['reused'])
+        self.assertNotEqual(third['catalog_version'], first['catalog_version'])
+
+    def test_rename_changes_catalog_version(self):
+        """Тест на новую версию каталога после переименования категории и магазина"""
+        first = async_export_products('jsonl')
+        for model, name in ((Category, 'Бытовая техника'), (Shop, 'Эльдорадо')):
+            reference = model.objects.get()
+            reference.name = name
+            reference.save()
+            result = async_export_products('jsonl')
+            self.assertFalse(result['reused'])
+            self.assertNotEqual(result['catalog_version'], first['catalog_version'])
+        row = json.loads(self.read_export(result['filename']).splitlines()[0])
+        self.assertEqual((row['category'], row['shop']), ('Бытовая техника', 'Эльдорадо'))
+
+        # Сохранение без смены названия версию не меняет
+        Shop.objects.get().save()
+        self.assertTrue(async_export_products('jsonl')['reused'])
+
+    @override_settings(EXPORT_KEEP_FULL=2)
+    def test_retention(self):
+        """Тест на удаление устаревших экспортов"""
+        filenames = []
+        for quantity in range(3):
+            ProductInfo.objects.filter(model='M1').update(quantity=quantity, updated_at=timezone.now())
+            filenames.append(async_export_products('jsonl')['filename'])
+        self.assertEqual(ProductExport.objects.count(), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.export_dir.name, filenames[0])))
+        self.assertFalse(os.path.exists(os.path.join(self.export_dir.name, f'{filenames[0]}.manifest.json')))
+        self.assertTrue(os.path.exists(os.path.join(self.export_dir.name, filenames[2])))
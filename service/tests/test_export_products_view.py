@@ -1,3 +1,5 @@
+from unittest.mock import patch
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework.test import APIRequestFactory
 from rest_framework import status
@@ -13,10 +15,33 @@ class ExportProductsViewTests(TestCase):
         self.user = CustomUser.objects.create_user(email='test@example.com', password='password', is_active=True)
         # Создаем токен для пользователя
         self.access_token = AccessToken.for_user(self.user)
+        # Блокировки экспорта хранятся в кеше и не должны переходить между тестами
+        cache.clear()
 
     def test_export_products_view(self):
         """Тест на успешный экспорт товаров в файл"""
         request = self.factory.post('/api/v1/export-products/')
         request.META['HTTP_AUTHORIZATION'] = f'Bearer {self.access_token}'
         response = self.view(request)
-        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    @patch('service.views.async_export_products.apply_async')
+    def test_export_format(self, apply_async):
+        """Тест на выбор формата экспорта"""
+        response = self.view(self.factory.post('/api/v1/export-products/', {'format': 'parquet'}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(apply_async.call_args.args, (('parquet', 'full'),))
+
+    @patch('service.views.async_export_products.apply_async')
+    def test_concurrent_exports_collapse(self, apply_async):
+        """Тест на объединение одинаковых запросов экспорта в одну задачу"""
+        first = self.view(self.factory.post('/api/v1/export-products/', {'format': 'jsonl'}))
+        second = self.view(self.factory.post('/api/v1/export-products/', {'format': 'jsonl'}))
+        self.assertEqual(apply_async.call_count, 1)
+        self.assertEqual(first.data['task_id'], second.data['task_id'])
+        self.assertEqual(apply_async.call_args.kwargs['task_id'], first.data['task_id'])
+
+    def test_unsupported_format(self):
+        """Тест на неподдерживаемый формат экспорта"""
+        response = self.view(self.factory.post('/api/v1/export-products/', {'format': 'xml'}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
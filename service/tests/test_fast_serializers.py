@@ -0,0 +1,113 @@
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+from urllib.parse import urlparse
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory, force_authenticate
+from service.fast_serializers import CompiledSerializer, NotCompilable
+from service.models import Cart, CartItem, Category, CustomUser, Order, OrderItem, Product, ProductInfo, Shop
+from service.views import CartView, OrdersListView, ProductsListView
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0)
+class FastSerializersParityTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.factory = APIRequestFactory()
+        self.user = CustomUser.objects.create_user(email='buyer@example.com', password='password', is_active=True)
+        phones = Category.objects.create(name='Смартфоны')
+        laptops = Category.objects.create(name='Ноутбуки')
+        shops = [Shop.objects.create(name='Связной'), Shop.objects.create(name='Ситилинк')]
+        self.offers = []
+        for number in range(6):
+            product = Product.objects.create(name=f'Смартфон {number}', category=phones if number % 2 else laptops)
+            for shop in shops[:number % 2 + 1]:
+                self.offers.append(ProductInfo.objects.create(
+                    product=product, shop=shop, model=f'M{number}',
+                    price=Decimal('999.90') + number * 100, quantity=number,
+                ))
+        Product.objects.create(name='Без предложений', category=phones)
+
+        content = io.BytesIO()
+        Image.new('RGB', (20, 10), 'red').save(content, 'JPEG')
+        product = self.offers[0].product
+        product.image = SimpleUploadedFile('phone.jpg', content.getvalue(), content_type='image/jpeg')
+        product.save()
+
+        for number in range(3):
+            order = Order.objects.create(user=self.user, total_amount=Decimal('1999.80'), status='confirmed')
+            for offer in self.offers[number:number + 2]:
+                OrderItem.objects.create(order=order, product=offer, quantity=number + 1)
+        cart = Cart.get_cart(self.user)
+        for offer in self.offers[:3]:
+            CartItem.objects.create(cart=cart, product=offer, quantity=2)
+
+    def render(self, view_class, url, compiled):
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        response = view_class.as_view(compiled_serializer=compiled)(request)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_parity(self, view_class, url):
+        with patch.object(CompiledSerializer, 'serialize', autospec=True,
+                          side_effect=CompiledSerializer.serialize) as serialize:
+            fast = self.render(view_class, url, True)
+        serialize.assert_called()
+        slow = self.render(view_class, url, False)
+        self.assertEqual(fast.rendered_content, slow.rendered_content)
+        return fast
+
+    def test_products_parity(self):
+        """Тест на побайтовое совпадение каталога с ответом ModelSerializer"""
+        for query in ('', 'ordering=-price', 'in_stock=true&ordering=created_at', 'search=смартфон',
+                      'fields=id,name,min_price', 'fields=id,category&expand=category', 'fields=image,category.name'):
+            with self.subTest(query=query):
+                url = f'/api/v1/products/?{query}&page_size=2'
+                while url:
+                    next_url = self.assert_parity(ProductsListView, url).data['next']
+                    url = f'/api/v1/products/?{urlparse(next_url).query}' if next_url else None
+
+    def test_orders_parity(self):
+        """Тест на побайтовое совпадение списка заказов с ответом ModelSerializer"""
+        for query in ('', 'fields=id,items.quantity,items.product.price', 'fields=id,items'):
+            with self.subTest(query=query):
+                self.assert_parity(OrdersListView, f'/api/v1/orders/?{query}')
+
+    def test_cart_parity(self):
+        """Тест на побайтовое совпадение корзины с ответом ModelSerializer"""
+        self.assert_parity(CartView, '/api/v1/cart/')
+
+    def test_orders_queries(self):
+        """Тест на постоянное число запросов при построении списка заказов"""
+        with CaptureQueriesContext(connection) as queries:
+            self.render(OrdersListView, '/api/v1/orders/', True).rendered_content
+        # Заказы с вложенными объектами по соединению и позиции одним запросом
+        self.assertEqual(len(queries), 2)
+
+    def test_not_compilable(self):
+        """Тест на отказ от компиляции сериализатора с вычисляемым полем"""
+        class MethodSerializer(serializers.ModelSerializer):
+            title = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Category
+                fields = ['id', 'title']
+
+            def get_title(self, category):
+                return category.name.upper()
+
+        with self.assertRaises(NotCompilable):
+            CompiledSerializer(MethodSerializer())
@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+from service.validation import clean_goods
+
+
+class CleanGoodsTests(SimpleTestCase):
+    def test_normalizes_and_deduplicates(self):
+        """Тест на нормализацию названий и удаление повторов товара магазина"""
+        records, rejected = clean_goods([
+            {'id': '1', 'name': '  Смартфон   Samsung ', 'shop': 'Связной', 'price': '100.555', 'quantity': 3},
+            {'id': 1, 'name': 'Смартфон Samsung', 'shop': 'Связной', 'price': 90, 'quantity': 2},
+            {'id': 2, 'name': 'Ноутбук', 'shop': 'Связной'},
+        ])
+        self.assertEqual(rejected, [])
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['name'], 'Смартфон Samsung')
+        self.assertEqual((records[0]['price'], records[0]['quantity']), (90, 2))
+        self.assertEqual((records[1]['price'], records[1]['quantity'], records[1]['category']), (0, 0, ''))
+
+    def test_rejected_rows_report(self):
+        """Тест на отчёт по строкам с неверными данными"""
+        records, rejected = clean_goods([
+            {'id': 1, 'name': 'Товар', 'price': 'дорого', 'quantity': 1},
+            {'id': 2.5, 'name': '', 'price': 10, 'quantity': -1},
+            'не словарь',
+            {'id': 3, 'name': 'Товар', 'price': 10, 'quantity': 1},
+        ], offset=10)
+        self.assertEqual([record['id'] for record in records], [3])
+        self.assertEqual([report['row'] for report in rejected], [11, 12, 13])
+        self.assertEqual(rejected[0]['errors'], ['price: ожидается число от 0 до 99999999.99'])
+        self.assertEqual(len(rejected[1]['errors']), 3)
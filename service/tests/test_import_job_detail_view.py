@@ -0,0 +1,30 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework import status
+from service.views import ImportJobDetailView
+from service.models import CustomUser, ImportJob
+
+
+class ImportJobDetailViewTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ImportJobDetailView.as_view()
+        self.user = CustomUser.objects.create_user(email='test@example.com', password='password', is_active=True)
+        self.job = ImportJob.objects.create(user=self.user, file_name='shop1.yaml', rows_processed=1000)
+
+    def test_import_job_detail_view(self):
+        """Тест на получение прогресса импорта"""
+        request = self.factory.get(f'/api/v1/import-jobs/{self.job.pk}/')
+        force_authenticate(request, user=self.user)
+        response = self.view(request, pk=self.job.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response.data['rows_processed'], 1000)
+
+    def test_foreign_import_job(self):
+        """Тест на недоступность чужого импорта"""
+        other = CustomUser.objects.create_user(email='other@example.com', password='password', is_active=True)
+        request = self.factory.get(f'/api/v1/import-jobs/{self.job.pk}/')
+        force_authenticate(request, user=other)
+        response = self.view(request, pk=self.job.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
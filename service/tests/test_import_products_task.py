@@ -0,0 +1,196 @@
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from billiard.exceptions import WorkerLostError
+from celery.app.task import Context, Task
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from service.models import Product, ProductInfo, Shop, Category, CustomUser, ImportJob
+from service.tasks import async_import_products
+from service.uploads import save_upload, upload_path, remove_upload
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+class ImportProductsTaskTests(TestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+        settings_override = override_settings(IMPORT_UPLOAD_DIR=self.upload_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with open(os.path.join(DATA_DIR, 'shop1.yaml'), 'rb') as file:
+            self.file_data = file.read()
+
+    def upload(self, content, name='shop1.yaml'):
+        return save_upload(SimpleUploadedFile(name, content))
+
+    def test_import_creates_products(self):
+        """Тест на создание товаров, магазинов и категорий при первом импорте"""
+        upload = self.upload(self.file_data)
+        result = async_import_products(upload, None)
+        self.assertEqual(result['result'], 'IMPORT_SUCCESSFUL')
+        self.assertEqual(result['created'], ProductInfo.objects.count())
+        self.assertEqual(result['updated'], 0)
+        self.assertEqual(Product.objects.count(), ProductInfo.objects.count())
+        self.assertTrue(Shop.objects.filter(name='Спортмастер').exists())
+        self.assertTrue(Category.objects.filter(name='Обувь').exists())
+        self.assertFalse(os.path.exists(upload_path(upload)))
+
+    def test_reimport_counts_unchanged_and_updated(self):
+        """Тест на повторный импорт: неизменные строки не перезаписываются"""
+        total = async_import_products(self.upload(self.file_data), None)['created']
+        changed = self.file_data.replace(b'price: 29990', b'price: 27990')
+        result = async_import_products(self.upload(changed), None)
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['unchanged'], total - 1)
+        self.assertEqual(ProductInfo.objects.get(product_id=1).price, Decimal('27990.00'))
+
+    def test_reimport_same_file_skips_writes(self):
+        """Тест на повторный импорт без изменений: в базу ничего не пишется"""
+        async_import_products(self.upload(self.file_data), None)
+        upload = self.upload(self.file_data)
+        with CaptureQueriesContext(connection) as queries:
+            result = async_import_products(upload, None)
+        self.assertEqual(result['updated'], 0)
+        writes = [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+    def test_name_change_updates_product(self):
+        """Тест на обновление названия товара при изменении строки прайса"""
+        async_import_products(self.upload(self.file_data), None)
+        renamed = self.file_data.replace('Samsung Galaxy A52'.encode(), 'Samsung Galaxy A53'.encode())
+        result = async_import_products(self.upload(renamed), None)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(Product.objects.get(pk=1).name, 'Смартфон Samsung Galaxy A53')
+
+    def test_manual_edit_resets_fingerprint(self):
+        """Тест на перезапись строки, изменённой вручную, при следующем импорте"""
+        async_import_products(self.upload(self.file_data), None)
+        offer = ProductInfo.objects.get(product_id=1)
+        offer.price = Decimal('1.00')
+        offer.save()
+        async_import_products(self.upload(self.file_data), None)
+        self.assertEqual(ProductInfo.objects.get(product_id=1).price, Decimal('29990.00'))
+
+    def test_product_edit_resets_fingerprint_only_on_name_or_category_change(self):
+        """Тест на сброс отпечатков предложений только при смене названия или категории товара"""
+        async_import_products(self.upload(self.file_data), None)
+        product = Product.objects.get(pk=1)
+        product.image_ppoi = '0.3x0.3'
+        product.save()
+        self.assertNotEqual(ProductInfo.objects.get(product_id=1).fingerprint, '')
+
+        product.name = 'Переименованный смартфон'
+        product.save()
+        self.assertEqual(ProductInfo.objects.get(product_id=1).fingerprint, '')
+        result = async_import_products(self.upload(self.file_data), None)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(Product.objects.get(pk=1).name, 'Смартфон Samsung Galaxy A52')
+
+    def test_rejected_rows_are_reported(self):
+        """Тест на пропуск строк с неверными данными и отчёт о них"""
+        broken = self.file_data.replace(b'quantity: 10', b'quantity: many')
+        result = async_import_products(self.upload(broken), None)
+        self.assertEqual(result['result'], 'IMPORT_SUCCESSFUL')
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(result['rejected'][0]['row'], 1)
+        self.assertFalse(ProductInfo.objects.filter(product_id=1).exists())
+
+    def test_csv_import(self):
+        """Тест на импорт прайса в формате CSV"""
+        content = 'id,name,category,model,price,quantity,shop\n1,Смартфон,Электроника,A52,29990,10,Связной\n'
+        result = async_import_products(self.upload(content.encode('utf-8'), 'prices.csv'), None)
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(ProductInfo.objects.get(product_id=1).shop.name, 'Связной')
+
+    def test_invalid_structure(self):
+        """Тест на файл без раздела goods"""
+        result = async_import_products(self.upload(b'version: 1\nshops: []'), None)
+        self.assertEqual(result['result'], 'INVALID_YAML_STRUCTURE')
+
+    def test_checksum_mismatch(self):
+        """Тест на отказ импорта при несовпадении контрольной суммы"""
+        upload = self.upload(self.file_data)
+        upload['checksum'] = '0' * 64
+        result = async_import_products(upload, None)
+        self.assertTrue(result['result'].startswith('LOADING_ERROR'))
+        self.assertFalse(ProductInfo.objects.exists())
+
+    def test_legacy_bytes_payload(self):
+        """Тест на совместимость с задачами, содержащими файл целиком"""
+        result = async_import_products(self.file_data, None)
+        self.assertEqual(result['result'], 'IMPORT_SUCCESSFUL')
+
+    def test_sharded_import(self):
+        """Тест на параллельный импорт крупного прайса по шардам"""
+        upload = self.upload(self.file_data)
+        with override_settings(IMPORT_SHARD_THRESHOLD=0, IMPORT_SHARD_SIZE=2):
+            result = async_import_products.apply(args=(upload, None)).get()
+        self.assertEqual(result['result'], 'IMPORT_SUCCESSFUL')
+        self.assertEqual(result['shards'], 3)
+        self.assertEqual(result['created'], 5)
+        self.assertEqual(ProductInfo.objects.count(), 5)
+        self.assertEqual(Shop.objects.count(), 2)
+        self.assertEqual(os.listdir(self.upload_dir.name), [])
+
+    def test_import_job_progress(self):
+        """Тест на сохранение прогресса и итогов импорта в ImportJob"""
+        user = CustomUser.objects.create_user(email='test@example.com', password='password')
+        job = ImportJob.objects.create(user=user)
+        with override_settings(IMPORT_BATCH_SIZE=2):
+            async_import_products(self.upload(self.file_data), user.id, job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.rows_total, 5)
+        self.assertEqual(job.rows_processed, 5)
+        self.assertEqual(job.created, 5)
+        self.assertIn('write', job.timings)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_sharded_import_links_error_callback(self):
+        """Тест на обработчик ошибки chord: сбой шарда завершает задачу импорта"""
+        user = CustomUser.objects.create_user(email='test@example.com', password='password')
+        job = ImportJob.objects.create(user=user)
+        with override_settings(IMPORT_SHARD_THRESHOLD=0, IMPORT_SHARD_SIZE=2), \
+                mock.patch.object(Task, 'replace', autospec=True, return_value=None) as replace:
+            async_import_products(self.upload(self.file_data), user.id, job.id)
+        shards_chord = replace.call_args.args[1]
+        self.addCleanup(lambda: [remove_upload(shard.args[0]) for shard in shards_chord.tasks])
+        errbacks = shards_chord.body.options['link_error']
+        self.assertEqual([errback.task for errback in errbacks], ['async_import_failed'])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        errbacks[0](Context(id='shard-task'), WorkerLostError('Worker exited prematurely'), None)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.result.startswith('LOADING_ERROR'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_sharded_import_matches_plain_import(self):
+        """Тест на шардированный импорт: справочники и номера отклонённых строк как при обычном импорте"""
+        content = (
+            'goods:\n'
+            '  - {id: 1, name: Кеды, category: Обувь, model: K1, price: 100, quantity: 1, shop: "Спорт  мастер"}\n'
+            '  - {id: 2, name: "", category: Мусор, model: K2, price: 100, quantity: 1, shop: Junk}\n'
+            '  - {id: 3, name: Туфли, category: "  Обувь  ", model: K3, price: -1, quantity: 1, shop: X}\n'
+        ).encode('utf-8')
+        results = {}
+        for threshold in (0, 10 ** 9):
+            Product.objects.all().delete()
+            Shop.objects.all().delete()
+            Category.objects.all().delete()
+            with override_settings(IMPORT_SHARD_THRESHOLD=threshold, IMPORT_SHARD_SIZE=1):
+                result = async_import_products.apply(args=(self.upload(content), None)).get()
+            results[threshold] = (
+                sorted(Category.objects.values_list('name', flat=True)),
+                sorted(Shop.objects.values_list('name', flat=True)),
+                [row['row'] for row in result['rejected']],
+            )
+        self.assertEqual(results[0], (['Обувь'], ['Спорт мастер'], [2, 3]))
+        self.assertEqual(results[0], results[10 ** 9])
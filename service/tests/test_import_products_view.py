@@ -1,4 +1,7 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase, override_settings
 from rest_framework.test import APIRequestFactory
 from rest_framework import status
 from service.views import ImportProductsView
@@ -8,6 +11,11 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 
 class ImportProductsViewTests(TestCase):
     def setUp(self):
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+        settings_override = override_settings(IMPORT_UPLOAD_DIR=self.upload_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
         self.factory = APIRequestFactory()
         self.view = ImportProductsView.as_view()
         # Создаем активного пользователя
@@ -31,4 +39,16 @@ goods:
         request = self.factory.post('/api/v1/import-products/', {'file': self.file}, format='multipart')
         request.META['HTTP_AUTHORIZATION'] = f'Bearer {self.access_token}'
         response = self.view(request)
-        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_import_passes_file_handle(self):
+        """Тест на передачу в задачу дескриптора файла вместо содержимого"""
+        request = self.factory.post('/api/v1/import-products/', {'file': self.file}, format='multipart')
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {self.access_token}'
+        with patch('service.views.async_import_products.delay') as delay:
+            delay.return_value.id = delay.return_value.task_id = 'task'
+            response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        upload = delay.call_args.args[0]
+        self.assertEqual(set(upload), {'path', 'checksum', 'size', 'name'})
+        self.assertTrue(os.path.exists(os.path.join(self.upload_dir.name, upload['path'])))
@@ -1,4 +1,5 @@
-from django.test import TestCase
+import tempfile
+from django.test import TestCase, override_settings
 from rest_framework.test import APIRequestFactory
 from rest_framework import status
 from service.views import PartnerUpdate
@@ -8,6 +9,11 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 
 class PartnerUpdateTests(TestCase):
     def setUp(self):
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+        settings_override = override_settings(IMPORT_UPLOAD_DIR=self.upload_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
         self.factory = APIRequestFactory()
         self.view = PartnerUpdate.as_view()
         # Создаем активного пользователя с ролью продавца
@@ -0,0 +1,94 @@
+import io
+import json
+import yaml
+from openpyxl import Workbook
+from django.test import SimpleTestCase
+from service.readers import iter_yaml_goods, iter_goods, detect_format, InvalidPriceList
+
+PRICE_LIST = '''\
+version: 1
+shop: Магазин Техносити
+categories:
+  - id: 1
+    name: Электроника
+goods:
+  - id: 1
+    name: Смартфон Samsung Galaxy A52
+    category: Электроника
+    price: 29990.5
+    quantity: 10
+    parameters: &params
+      color: black
+  - {id: 2, name: "Ноутбук", category: Компьютеры, price: 59990, quantity: 5, parameters: *params}
+'''
+
+
+class YamlGoodsReaderTests(SimpleTestCase):
+    def test_stream_matches_safe_load(self):
+        """Тест на совпадение потокового разбора с yaml.safe_load"""
+        items = list(iter_yaml_goods(io.BytesIO(PRICE_LIST.encode('utf-8'))))
+        self.assertEqual(items, yaml.safe_load(PRICE_LIST)['goods'])
+
+    def test_alias_to_skipped_section(self):
+        """Тест на псевдонимы в goods, ссылающиеся на якоря в пропускаемых разделах"""
+        content = (
+            'shop: &shop Связной\n'
+            'categories:\n'
+            '  - {id: 1, name: &phones Смартфоны, tags: [&new новинка]}\n'
+            'goods:\n'
+            '  - {id: 1, name: Смартфон, category: *phones, shop: *shop, tag: *new}\n'
+        )
+        items = list(iter_yaml_goods(io.BytesIO(content.encode('utf-8'))))
+        self.assertEqual(items, yaml.safe_load(content)['goods'])
+        self.assertEqual(items[0]['shop'], 'Связной')
+
+    def test_missing_goods(self):
+        """Тест на прайс без раздела goods"""
+        with self.assertRaises(InvalidPriceList):
+            list(iter_yaml_goods(io.BytesIO(b'version: 1\nshops: []\n')))
+
+
+class PriceListFormatsTests(SimpleTestCase):
+    expected = [
+        {'id': '1', 'name': 'Смартфон', 'price': '29990', 'quantity': '10'},
+        {'id': '2', 'name': 'Ноутбук', 'quantity': '5'},
+    ]
+
+    def test_csv(self):
+        """Тест на чтение CSV с разделителем точка с запятой и пустой ячейкой"""
+        content = 'ID;name;price;quantity\n1;Смартфон;29990;10\n2;Ноутбук;;5\n'.encode('utf-8-sig')
+        self.assertEqual(list(iter_goods(io.BytesIO(content), 'prices.csv')), self.expected)
+
+    def test_jsonl(self):
+        """Тест на чтение JSON Lines"""
+        content = '\n'.join(json.dumps(item, ensure_ascii=False) for item in self.expected).encode('utf-8')
+        self.assertEqual(list(iter_goods(io.BytesIO(content), 'prices.jsonl')), self.expected)
+
+    def test_xlsx(self):
+        """Тест на построчное чтение XLSX"""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['id', 'name', 'price', 'quantity'])
+        sheet.append([1, 'Смартфон', 29990, 10])
+        sheet.append([2, 'Ноутбук', None, 5])
+        content = io.BytesIO()
+        workbook.save(content)
+        content.seek(0)
+        self.assertEqual(list(iter_goods(content, 'prices.xlsx')), [
+            {'id': 1, 'name': 'Смартфон', 'price': 29990, 'quantity': 10},
+            {'id': 2, 'name': 'Ноутбук', 'quantity': 5},
+        ])
+
+    def test_csv_without_required_columns(self):
+        """Тест на CSV без обязательных колонок"""
+        with self.assertRaises(InvalidPriceList):
+            list(iter_goods(io.BytesIO(b'sku,price\n1,10\n'), 'prices.csv'))
+
+    def test_detect_format_by_content(self):
+        """Тест на определение формата файла без расширения"""
+        self.assertEqual(detect_format('prices', b'PK\x03\x04...'), 'xlsx')
+        self.assertEqual(detect_format('prices', b'{"id": 1}'), 'jsonl')
+        self.assertEqual(detect_format('prices', b'id,name\n1,a'), 'csv')
+        self.assertEqual(detect_format('prices', b'version: 1\ngoods:'), 'yaml')
+        self.assertEqual(detect_format('prices', '# Прайс, версия 1\nversion: 1\ngoods:'.encode()), 'yaml')
+        self.assertEqual(detect_format('prices', b'%YAML 1.1\n---\nshop: a, b\ngoods:'), 'yaml')
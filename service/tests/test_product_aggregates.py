@@ -0,0 +1,95 @@
+from decimal import Decimal
+from urllib.parse import urlparse
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework import status
+from service.importers import ProductImporter
+from service.models import Category, Product, ProductInfo, Shop
+from service.views import ProductsListView
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0)
+class ProductAggregatesTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Электроника')
+        self.shop = Shop.objects.create(name='Связной')
+        self.other_shop = Shop.objects.create(name='Эльдорадо')
+        self.product = Product.objects.create(name='Смартфон', category=self.category)
+
+    def test_offer_writes_update_aggregates(self):
+        """Тест на пересчёт цен и остатков при изменении предложений"""
+        offer = ProductInfo.objects.create(product=self.product, shop=self.shop, model='A', price=Decimal('100'), quantity=2)
+        ProductInfo.objects.create(product=self.product, shop=self.other_shop, model='A', price=Decimal('80'), quantity=3)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.min_price, self.product.max_price), (Decimal('80'), Decimal('100')))
+        self.assertEqual((self.product.total_quantity, self.product.offers_count), (5, 2))
+
+        offer.delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.max_price, self.product.total_quantity, self.product.offers_count),
+                         (Decimal('80'), 3, 1))
+
+    def test_stale_product_save_keeps_aggregates(self):
+        """Тест на сохранение сводки при записи ранее загруженного товара"""
+        ProductInfo.objects.create(product=self.product, shop=self.shop, model='A', price=Decimal('100'), quantity=2)
+        self.product.name = 'Смартфон Pro'
+        self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.offers_count), ('Смартфон Pro', 1))
+
+    def test_inactive_shop_is_excluded(self):
+        """Тест на исключение предложений неактивного магазина из сводки"""
+        ProductInfo.objects.create(product=self.product, shop=self.shop, model='A', price=Decimal('100'), quantity=2)
+        self.shop.state = False
+        self.shop.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.min_price, self.product.offers_count), (None, 0))
+
+    def test_import_updates_aggregates(self):
+        """Тест на пересчёт сводки при импорте прайса"""
+        importer = ProductImporter()
+        importer.run([{'id': self.product.id, 'name': 'Смартфон', 'category': 'Электроника', 'shop': 'Связной',
+                       'model': 'A', 'price': 150, 'quantity': 4}])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.min_price, self.product.total_quantity), (Decimal('150'), 4))
+        importer.run([{'id': self.product.id, 'name': 'Смартфон', 'category': 'Электроника', 'shop': 'Связной',
+                       'model': 'A', 'price': 120, 'quantity': 0}])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.min_price, self.product.total_quantity), (Decimal('120'), 0))
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0)
+class CatalogPriceOrderingTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ProductsListView.as_view()
+        category = Category.objects.create(name='Электроника')
+        shop = Shop.objects.create(name='Связной')
+        self.products = {}
+        for name, price, quantity in [('A', 300, 1), ('B', 100, 0), ('C', 200, 5), ('D', 100, 2)]:
+            product = Product.objects.create(name=name, category=category)
+            ProductInfo.objects.create(product=product, shop=shop, model=name, price=price, quantity=quantity)
+            self.products[name] = product
+        # Товар без предложений не участвует в сортировке по цене
+        Product.objects.create(name='E', category=category)
+
+    def names(self, query):
+        names = []
+        url = f'/api/v1/products/?{query}&page_size=1'
+        while url:
+            response = self.view(self.factory.get(url))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(item['name'] for item in response.data['results'])
+            next_url = response.data['next']
+            url = f'/api/v1/products/?{urlparse(next_url).query}' if next_url else None
+        return names
+
+    def test_price_ordering(self):
+        """Тест на сортировку каталога по цене с постраничным выводом"""
+        self.assertEqual(self.names('ordering=price'), ['B', 'D', 'C', 'A'])
+        self.assertEqual(self.names('ordering=-price'), ['A', 'C', 'D', 'B'])
+
+    def test_in_stock_and_price_filters(self):
+        """Тест на фильтры наличия и диапазона цен"""
+        self.assertEqual(self.names('in_stock=true&ordering=price'), ['D', 'C', 'A'])
+        self.assertEqual(self.names('price_min=150&price_max=250'), ['C'])
@@ -0,0 +1,53 @@
+import json
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework import status
+from service.models import Category, Product, ProductInfo, Shop
+from service.views import ProductOffersView
+
+
+@override_settings(CACHALOT_ENABLED=False, PRODUCT_OFFERS_MAX_IDS=3)
+class ProductOffersViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.view = ProductOffersView.as_view()
+        category = Category.objects.create(name='Смартфоны')
+        self.phone = Product.objects.create(name='Смартфон', category=category)
+        self.laptop = Product.objects.create(name='Ноутбук', category=category)
+        shops = {name: Shop.objects.create(name=name) for name in ('Связной', 'Ситилинк', 'Закрытый')}
+        Shop.objects.filter(name='Закрытый').update(state=False)
+        for product, shop, price in ((self.phone, 'Связной', '900'), (self.phone, 'Ситилинк', '850'),
+                                     (self.phone, 'Закрытый', '100'), (self.laptop, 'Связной', '50000')):
+            ProductInfo.objects.create(product=product, shop=shops[shop], model='A', price=Decimal(price), quantity=1)
+
+    def get(self, url, **kwargs):
+        response = self.view(self.factory.get(url), **kwargs)
+        return response, json.loads(response.content) if response.status_code == 200 else response.data
+
+    def test_offers_sorted_by_price(self):
+        """Тест на предложения товара активных магазинов по возрастанию цены"""
+        response, offers = self.get(f'/api/v1/products/{self.phone.id}/offers/', pk=self.phone.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(offer['shop_name'], offer['price']) for offer in offers],
+                         [('Ситилинк', '850.00'), ('Связной', '900.00')])
+        self.assertEqual(set(offers[0]), {'id', 'product', 'shop', 'shop_name', 'model', 'price', 'quantity'})
+
+    def test_offers_for_many_products(self):
+        """Тест на предложения по нескольким товарам одним запросом к базе"""
+        with CaptureQueriesContext(connection) as queries:
+            response, offers = self.get(f'/api/v1/products/offers/?ids={self.laptop.id},{self.phone.id}')
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"shop_active"', queries[0]['sql'])
+        self.assertEqual([offer['product'] for offer in offers], [self.phone.id, self.phone.id, self.laptop.id])
+
+    def test_invalid_ids(self):
+        """Тест на ошибку при некорректном или слишком длинном списке товаров"""
+        for query in ('', 'ids=1,a', 'ids=1,2,3,4'):
+            with self.subTest(query=query):
+                response, _ = self.get(f'/api/v1/products/offers/?{query}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,72 @@
+from urllib.parse import urlparse
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework import status
+from service.models import Category, Product
+from service.search import search_products, suspend_search_triggers, restore_search_triggers
+from service.views import ProductsListView
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0)
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ProductsListView.as_view()
+        self.phones = Category.objects.create(name='Смартфоны')
+        self.laptops = Category.objects.create(name='Ноутбуки')
+        self.galaxy = Product.objects.create(name='Смартфон Samsung Galaxy', category=self.phones)
+        self.iphone = Product.objects.create(name='Apple iPhone', category=self.phones)
+        self.book = Product.objects.create(name='Samsung Galaxy Book', category=self.laptops)
+
+    def search(self, text):
+        return list(search_products(Product.objects.all(), text).order_by('search_rank', 'id'))
+
+    def test_ranked_search(self):
+        """Тест на поиск по префиксу без учёта регистра с сортировкой по релевантности"""
+        self.assertEqual(self.search('смартф'), [self.galaxy, self.iphone])
+        self.assertEqual(self.search('SAMSUNG galaxy'), [self.galaxy, self.book])
+
+    def test_index_follows_changes(self):
+        """Тест на обновление индекса при изменении, массовой вставке и удалении товаров"""
+        self.laptops.name = 'Планшеты'
+        self.laptops.save()
+        self.assertEqual(self.search('планшет'), [self.book])
+
+        self.iphone.name = 'Apple iPad'
+        self.iphone.save()
+        self.assertEqual(self.search('iphone'), [])
+
+        Product.objects.bulk_create([Product(id=100, name='Samsung Tab', category=self.laptops)])
+        self.assertIn(100, [product.id for product in self.search('samsung')])
+        self.galaxy.delete()
+        self.assertNotIn(self.galaxy, self.search('samsung'))
+
+    def test_search_view_pagination(self):
+        """Тест на постраничный вывод результатов поиска"""
+        ids = []
+        url = '/api/v1/products/?search=samsung&page_size=1'
+        while url:
+            response = self.view(self.factory.get(url))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            next_url = response.data['next']
+            url = f'/api/v1/products/?{urlparse(next_url).query}' if next_url else None
+        self.assertEqual(ids, [self.galaxy.id, self.book.id])
+
+    def test_triggers_restored_after_migrate(self):
+        """Тест на восстановление триггеров и перестроение индекса после миграций"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Триггеры обслуживаются только для SQLite')
+        app_config = apps.get_app_config('service')
+        suspend_search_triggers(app_config, using='default')
+        # Без триггеров изменение, сделанное миграцией, в индекс не попадает
+        Product.objects.filter(pk=self.iphone.pk).update(name='Apple iPad')
+        self.assertEqual(self.search('ipad'), [])
+
+        restore_search_triggers(app_config, using='default')
+        self.assertEqual(self.search('ipad'), [self.iphone])
+        self.laptops.name = 'Планшеты'
+        self.laptops.save()
+        self.assertEqual(self.search('планшет'), [self.book])
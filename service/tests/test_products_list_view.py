@@ -1,8 +1,14 @@
 from unittest.mock import patch
-from django.test import TestCase
+from urllib.parse import urlparse
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIRequestFactory
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework_simplejwt.tokens import AccessToken
+from service.mixins import QueryBudgetExceeded
+from service.models import Category, CustomUser, Product
 from service.views import ProductsListView
 
 class ProductsListViewTests(TestCase):
@@ -20,4 +26,82 @@ class ProductsListViewTests(TestCase):
             request = self.factory.get('/api/v1/products/')
             response = self.view(request)
             self.assertEqual(response.status_code, status.HTTP_200_OK)
-            self.assertEqual(len(response.data), len(product_data))  # Проверка количества элементов
\ No newline at end of file
+            self.assertEqual(len(response.data), len(product_data))  # Проверка количества элементов
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0, QUERY_BUDGET_STRICT=True)
+class ProductsListQueriesTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ProductsListView.as_view()
+
+    def create_products(self, count):
+        start = Product.objects.count()
+        for number in range(start, start + count):
+            category = Category.objects.create(name=f'Категория {number}')
+            Product.objects.create(name=f'Товар {number}', category=category)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(self.factory.get('/api/v1/products/'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_queries_do_not_depend_on_products_count(self):
+        """Тест на постоянное число запросов при росте числа товаров"""
+        self.create_products(2)
+        few = self.count_queries()
+        self.create_products(20)
+        self.assertEqual(self.count_queries(), few)
+        self.assertLessEqual(few, ProductsListView.query_budget)
+
+    def test_authenticated_filtered_request_fits_budget(self):
+        """Тест на бюджет запросов с JWT-авторизацией и фильтром по категории"""
+        self.create_products(3)
+        user = CustomUser.objects.create_user(email='test@example.com', password='password', is_active=True)
+        category = Category.objects.first()
+        request = self.factory.get(f'/api/v1/products/?category={category.id}')
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertLessEqual(len(queries), ProductsListView.query_budget)
+
+    def test_query_budget_exceeded(self):
+        """Тест на ошибку при превышении бюджета запросов"""
+        self.create_products(5)
+        # Без select_related категория каждого товара загружается отдельным запросом
+        with patch('service.mixins.related_lookups', return_value=([], [])), \
+                patch.object(ProductsListView, 'compiled_serializer', False):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.view(self.factory.get('/api/v1/products/'))
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0)
+class ProductsListPaginationTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = ProductsListView.as_view()
+        category = Category.objects.create(name='Электроника')
+        self.ids = [Product.objects.create(name=f'Товар {number}', category=category).id for number in range(5)]
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(self.factory.get(url))
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries))
+        return response
+
+    def test_cursor_pagination(self):
+        """Тест на обход каталога по курсору"""
+        ids = []
+        url = '/api/v1/products/?page_size=2'
+        while url:
+            response = self.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(item['id'] for item in response.data['results'])
+            next_url = response.data['next']
+            url = f'/api/v1/products/?{urlparse(next_url).query}' if next_url else None
+        self.assertEqual(ids, self.ids)
+        self.assertIsNotNone(response.data['previous'])
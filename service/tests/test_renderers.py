@@ -0,0 +1,46 @@
+import io
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from service.renderers import ORJSONRenderer, ORJSONParser
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    data = {
+        'results': [{'id': 1, 'name': 'Смартфон «A52»\u2028', 'price': '29990.50', 'raw': Decimal('1.5'),
+                     'category': {'id': 2, 'name': 'Электроника'}, 'image': {}, 'ratio': 0.25, 'stock': None}],
+        'next': None,
+    }
+
+    def test_same_bytes_as_drf(self):
+        """Тест на совпадение вывода с JSONRenderer DRF"""
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_indent(self):
+        """Тест на форматированный вывод при запросе отступа"""
+        content = ORJSONRenderer().render(self.data, 'application/json; indent=4')
+        self.assertEqual(content, JSONRenderer().render(self.data, 'application/json; indent=4'))
+
+
+class ORJSONParserTests(SimpleTestCase):
+    def test_parse(self):
+        """Тест на разбор тела запроса в UTF-8 и другой кодировке"""
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('{"name": "Смартфон"}'.encode('utf-8'))),
+                         {'name': 'Смартфон'})
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('["Смартфон"]'.encode('cp1251')),
+                                              parser_context={'encoding': 'cp1251'}), ['Смартфон'])
+
+    def test_invalid_json(self):
+        """Тест на ошибку разбора некорректного JSON"""
+        for content in (b'{"name": ', b'[NaN]'):
+            with self.subTest(content=content), self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(content))
+
+    def test_benchmark_command(self):
+        """Тест на запуск замера скорости кодирования JSON"""
+        output = io.StringIO()
+        call_command('benchmark_json', products=10, orders=2, items=2, repeat=1, stdout=output)
+        self.assertIn('рендеринг', output.getvalue())
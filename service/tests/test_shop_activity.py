@@ -0,0 +1,79 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework import status
+from service.catalog_cache import catalog_version
+from service.importers import ProductImporter
+from service.models import Cart, CartItem, Category, CustomUser, Product, ProductInfo, Shop
+from service.views import AddToCartView, PlaceOrderView
+
+
+@override_settings(CACHALOT_ENABLED=False)
+class ShopActivityTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = CustomUser.objects.create_user(email='buyer@example.com', password='password', is_active=True)
+        category = Category.objects.create(name='Смартфоны')
+        self.shop = Shop.objects.create(name='Связной')
+        self.product = Product.objects.create(name='Смартфон', category=category)
+        self.offer = ProductInfo.objects.create(product=self.product, shop=self.shop, model='A',
+                                                price=Decimal('900'), quantity=5)
+
+    def set_shop_state(self, state):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shop.state = state
+            self.shop.save()
+
+    def post(self, view_class, url, data):
+        request = self.factory.post(url, data, format='json')
+        force_authenticate(request, user=self.user)
+        return view_class.as_view()(request)
+
+    def test_toggle_updates_offers(self):
+        """Тест на обновление флага предложений, сводки товара и версии каталога при переключении магазина"""
+        version = catalog_version()
+        self.set_shop_state(False)
+        self.assertFalse(ProductInfo.objects.get(pk=self.offer.pk).shop_active)
+        self.assertFalse(ProductInfo.objects.active().exists())
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.min_price, self.product.offers_count), (None, 0))
+        self.assertNotEqual(catalog_version(), version)
+
+        self.set_shop_state(True)
+        self.assertEqual(list(ProductInfo.objects.active()), [self.offer])
+
+    def test_save_without_state_change_skips_refresh(self):
+        """Тест на сохранение магазина без смены активности: сводка и фасеты не пересчитываются"""
+        version = catalog_version()
+        self.shop.name = 'Связной Плюс'
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.shop.save()
+        self.assertFalse([query['sql'] for query in queries if '"service_product"' in query['sql']
+                          or '"service_catalogfacet"' in query['sql']])
+        self.assertNotEqual(catalog_version(), version)
+
+    def test_active_offers_without_join(self):
+        """Тест на выборку активных предложений без соединения с магазином"""
+        with CaptureQueriesContext(connection) as queries:
+            list(ProductInfo.objects.active().filter(product=self.product))
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+    def test_import_into_inactive_shop(self):
+        """Тест на импорт новых предложений неактивного магазина"""
+        self.set_shop_state(False)
+        ProductImporter().run([{'id': 500, 'name': 'Планшет', 'category': 'Планшеты', 'shop': 'Связной',
+                                'model': 'C', 'price': 2000, 'quantity': 3}])
+        self.assertFalse(ProductInfo.objects.get(product_id=500).shop_active)
+        self.assertEqual(Product.objects.get(pk=500).offers_count, 0)
+
+    def test_cart_and_order_reject_inactive_shop(self):
+        """Тест на отказ добавить в корзину и заказать товар неактивного магазина"""
+        CartItem.objects.create(cart=Cart.get_cart(self.user), product=self.offer, quantity=1)
+        self.set_shop_state(False)
+        response = self.post(AddToCartView, '/api/v1/add-to-cart/', [{'product': self.offer.id, 'quantity': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post(PlaceOrderView, '/api/v1/place-order/', {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.user.orders.exists())
@@ -0,0 +1,74 @@
+import json
+from decimal import Decimal
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework import status
+from versatileimagefield.serializers import VersatileImageFieldSerializer
+from service.models import Category, CustomUser, Order, OrderItem, Product, ProductInfo, Shop
+from service.serializers import parse_field_paths
+from service.views import OrdersListView, ProductsListView
+
+
+@override_settings(CACHALOT_ENABLED=False, CATALOG_CACHE_TIMEOUT=0)
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.category = Category.objects.create(name='Смартфоны')
+        self.shop = Shop.objects.create(name='Связной')
+        self.product = Product.objects.create(name='Смартфон', category=self.category)
+        self.offer = ProductInfo.objects.create(product=self.product, shop=self.shop, model='A',
+                                                price=Decimal('900'), quantity=5)
+
+    def get_products(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = ProductsListView.as_view()(self.factory.get(f'/api/v1/products/?{query}'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.rendered_content)['results'][0], queries
+
+    def test_parse_field_paths(self):
+        """Тест на разбор списка полей с вложенными путями"""
+        self.assertEqual(parse_field_paths('id, name,category.name,category.id,'),
+                         {'id': {}, 'name': {}, 'category': {'name': {}, 'id': {}}})
+
+    def test_sparse_product_fields(self):
+        """Тест на выдачу только запрошенных полей товара без соединения с категорией и изображений"""
+        with patch.object(VersatileImageFieldSerializer, 'to_representation') as image:
+            item, queries = self.get_products('fields=id,name,min_price')
+        self.assertEqual(item, {'id': self.product.id, 'name': 'Смартфон', 'min_price': '900.00'})
+        image.assert_not_called()
+        page = [query['sql'] for query in queries if 'FROM "service_product"' in query['sql']]
+        self.assertTrue(page)
+        self.assertFalse(any('JOIN' in sql for sql in page))
+
+    def test_nested_as_primary_key_and_expanded(self):
+        """Тест на выдачу вложенного объекта ключом или раскрытым через expand и путь через точку"""
+        item, _ = self.get_products('fields=id,category')
+        self.assertEqual(item, {'id': self.product.id, 'category': self.category.id})
+        item, _ = self.get_products('fields=id,category&expand=category')
+        self.assertEqual(item['category'], {'id': self.category.id, 'name': 'Смартфоны'})
+        item, _ = self.get_products('fields=category.name')
+        self.assertEqual(item, {'category': {'name': 'Смартфоны'}})
+
+    def test_all_fields_by_default(self):
+        """Тест на прежний ответ без параметра fields"""
+        item, _ = self.get_products('')
+        self.assertEqual(item['category'], {'id': self.category.id, 'name': 'Смартфоны'})
+        self.assertIn('image', item)
+
+    def test_sparse_orders(self):
+        """Тест на выбор полей позиций заказа и подгрузку только нужных связей"""
+        user = CustomUser.objects.create_user(email='buyer@example.com', password='password', is_active=True)
+        for _ in range(3):
+            order = Order.objects.create(user=user, total_amount=Decimal('1800'))
+            OrderItem.objects.create(order=order, product=self.offer, quantity=2)
+        request = self.factory.get('/api/v1/orders/?fields=id,items.quantity,items.product.price')
+        force_authenticate(request, user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = OrdersListView.as_view(compiled_serializer=False)(request)
+            orders = json.loads(response.rendered_content)
+        self.assertEqual(orders[0]['items'], [{'quantity': 2, 'product': {'price': '900.00'}}])
+        # Заказы, позиции и предложения - по одному запросу независимо от числа заказов
+        self.assertEqual(len(queries), 3)
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadIntegrityError(Exception):
+    """
+    Сохранённый файл не совпадает с контрольной суммой из дескриптора.
+    """
+
+
+def save_upload(file_obj):
+    """
+    Сохраняет загруженный файл в каталог импорта порциями.
+    Возвращает дескриптор (путь и контрольную сумму), который передаётся в задачу вместо содержимого.
+    """
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    extension = os.path.splitext(file_obj.name or '')[1].lower()
+    filename = f'{uuid.uuid4().hex}{extension}'
+    digest = hashlib.sha256()
+    size = 0
+    with open(os.path.join(settings.IMPORT_UPLOAD_DIR, filename), 'wb') as destination:
+        for chunk in file_obj.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+            destination.write(chunk)
+            size += len(chunk)
+    return {'path': filename, 'checksum': digest.hexdigest(), 'size': size, 'name': file_obj.name}
+
+
+def upload_path(upload):
+    """
+    Абсолютный путь к сохранённому файлу. Имя из дескриптора не может выйти за пределы каталога импорта.
+    """
+    return os.path.join(settings.IMPORT_UPLOAD_DIR, os.path.basename(upload['path']))
+
+
+def file_checksum(path):
+    """
+    Считает SHA-256 файла, читая его порциями.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def open_upload(upload):
+    """
+    Открывает сохранённый файл на чтение после проверки контрольной суммы.
+    """
+    path = upload_path(upload)
+    if file_checksum(path) != upload['checksum']:
+        raise UploadIntegrityError(f"Контрольная сумма файла {upload['path']} не совпадает")
+    with open(path, 'rb') as stream:
+        yield stream
+
+
+def remove_upload(upload):
+    """
+    Удаляет сохранённый файл после обработки.
+    """
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def write_shards(items, shard_size):
+    """
+    Раскладывает элементы прайса по файлам-шардам в формате JSON Lines.
+    Возвращает дескрипторы шардов в том же виде, что и save_upload,
+    с числом строк шарда и числом строк файла перед ним.
+    """
+    shards = []
+    destination = None
+    try:
+        for index, item in enumerate(items):
+            if index % shard_size == 0:
+                if destination:
+                    shards.append(_close_shard(destination))
+                destination = _open_shard(index)
+            line = (json.dumps(item, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+            destination['file'].write(line)
+            destination['digest'].update(line)
+            destination['size'] += len(line)
+            destination['rows'] += 1
+        if destination:
+            shards.append(_close_shard(destination))
+    except Exception:
+        if destination:
+            destination['file'].close()
+            shards.append(destination)
+        for shard in shards:
+            remove_upload(shard)
+        raise
+    return shards
+
+
+def _open_shard(offset):
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    filename = f'{uuid.uuid4().hex}.jsonl'
+    return {
+        'path': filename,
+        'file': open(os.path.join(settings.IMPORT_UPLOAD_DIR, filename), 'wb'),
+        'digest': hashlib.sha256(),
+        'size': 0,
+        'rows': 0,
+        'offset': offset,
+    }
+
+
+def _close_shard(destination):
+    destination['file'].close()
+    return {
+        'path': destination['path'],
+        'checksum': destination['digest'].hexdigest(),
+        'size': destination['size'],
+        'name': destination['path'],
+        'rows': destination['rows'],
+        'offset': destination['offset'],
+    }
@@ -11,6 +11,8 @@ urlpatterns = [
 
     # Товары и инвентарь
     path('products/', ProductsListView.as_view(), name='products-list'),           # Список товаров
+    path('products/offers/', ProductOffersView.as_view(), name='products-offers'),  # Предложения по нескольким товарам
+    path('products/<int:pk>/offers/', ProductOffersView.as_view(), name='product-offers'),  # Предложения по товару
     path('add-to-cart/', AddToCartView.as_view(), name='add-to-cart'),            # Добавление товара в корзину
     path('remove-from-cart/<int:pk>/', RemoveFromCartView.as_view(), name='remove-from-cart'),  # Удаление товара из корзины
     path('cart/', CartView.as_view(), name='cart-detail'),                         # Просмотр корзины
@@ -28,6 +30,8 @@ urlpatterns = [
     # Импорт и экспорт данных
     path('import-products/', ImportProductsView.as_view(), name='import-products'),  # Импорт товаров из файла
     path('export-products/', ExportProductsView.as_view(), name='export-products'),  # Экспорт товаров в файл
+    path('import-jobs/<int:pk>/', ImportJobDetailView.as_view(), name='import-job-detail'),  # Прогресс импорта
+    path('exports/<int:pk>/download/', ExportDownloadView.as_view(), name='export-download'),  # Скачивание файла экспорта
 
     # Контакты
     path('add-contact/', AddContactView.as_view(), name='add-contact'),             # Добавление контактных данных
@@ -0,0 +1,61 @@
+import pandas as pd
+
+# Текстовые поля строки прайса и их максимальная длина в модели
+TEXT_FIELDS = {'name': 150, 'category': 100, 'shop': 80, 'model': 80}
+COLUMNS = ['id', *TEXT_FIELDS, 'price', 'quantity']
+MAX_PRICE = 10 ** 8  # DecimalField(max_digits=10, decimal_places=2)
+MAX_QUANTITY = 2 ** 31 - 1
+
+
+def clean_goods(items, offset=0):
+    """
+    Проверяет и нормализует пакет элементов прайса векторными операциями pandas.
+    Возвращает чистые записи и отчёт по отклонённым строкам.
+    Номера строк в отчёте считаются от начала файла с учётом offset.
+    """
+    frame = pd.DataFrame.from_records(
+        [item if isinstance(item, dict) else {} for item in items], columns=COLUMNS
+    )
+    frame.index = pd.RangeIndex(offset + 1, offset + 1 + len(frame))
+    problems = {}
+
+    for field, max_length in TEXT_FIELDS.items():
+        text = frame[field].where(frame[field].notna(), '').astype(str)
+        frame[field] = text.str.strip().str.replace(r'\s+', ' ', regex=True)
+        problems[f'{field}: длиннее {max_length} символов'] = frame[field].str.len() > max_length
+    problems['name: обязательное поле'] = frame['name'] == ''
+
+    ids = pd.to_numeric(frame['id'], errors='coerce')
+    problems['id: ожидается положительное целое число'] = ids.isna() | (ids <= 0) | (ids % 1 != 0)
+
+    # Отсутствующие цена и количество, как и раньше, считаются нулём
+    price = pd.to_numeric(frame['price'], errors='coerce')
+    problems['price: ожидается число от 0 до 99999999.99'] = (
+        (frame['price'].notna() & price.isna()) | (price < 0) | (price >= MAX_PRICE)
+    )
+    quantity = pd.to_numeric(frame['quantity'], errors='coerce')
+    problems['quantity: ожидается неотрицательное целое число'] = (
+        (frame['quantity'].notna() & quantity.isna()) | (quantity < 0) | (quantity > MAX_QUANTITY)
+        | (quantity.notna() & (quantity % 1 != 0))
+    )
+
+    flags = pd.DataFrame(problems)
+    rejected_mask = flags.any(axis=1)
+    rejected = [
+        {
+            'row': int(row),
+            'id': None if pd.isna(frame.at[row, 'id']) else str(frame.at[row, 'id']),
+            'errors': [message for message, failed in row_flags.items() if failed],
+        }
+        for row, row_flags in flags[rejected_mask].iterrows()
+    ]
+
+    valid = ~rejected_mask
+    clean = frame[valid].assign(
+        id=ids[valid].astype('int64'),
+        price=price[valid].fillna(0).round(2),
+        quantity=quantity[valid].fillna(0).astype('int64'),
+    )
+    # При повторе товара магазина побеждает последняя строка, как и при построчной загрузке
+    clean = clean.drop_duplicates(subset=['id', 'shop'], keep='last')
+    return clean.to_dict('records'), rejected
@@ -1,18 +1,24 @@
 import json
+import mimetypes
+import os
+import time
+import uuid
 from distutils.util import strtobool
 from tempfile import NamedTemporaryFile
 import jwt
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import UploadedFile
-from django.shortcuts import render
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.generics import ListAPIView, CreateAPIView, UpdateAPIView, RetrieveAPIView, DestroyAPIView, \
     GenericAPIView
 from rest_framework.parsers import MultiPartParser
@@ -25,10 +31,18 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from .tasks import async_import_products, async_send_order_confirmation, send_password_reset_email, \
     send_admin_invoice_email, async_export_products
 from .models import Shop, Order, CustomUser, Product, ProductInfo, OrderItem, Cart, CartItem, PasswordResetToken, \
-    Contact
+    Contact, ImportJob, ProductExport
 from .serializers import OrderSerializer, ProductSerializer, CartSerializer, ContactSerializer,  \
     RegistrationSerializer, LoginSerializer, PasswordResetRequestSerializer, PasswordResetConfirmSerializer, \
-    MultipleCartItemsSerializer
+    MultipleCartItemsSerializer, ImportJobSerializer, ProductOfferSerializer
+from .uploads import save_upload
+from .mixins import QueryBudgetMixin, CatalogCacheMixin, SparseQuerysetMixin, CompiledSerializerMixin
+from .pagination import CatalogCursorPagination
+from .search import FullTextSearchFilter
+from .filters import ProductFilter, CatalogOrderingFilter
+from .facets import catalog_facets
+from .catalog_cache import LIST_SCOPE, category_scope, product_scope
+from .exporters import EXPORT_FORMATS, export_path, iter_file_range, export_lock_key
 import logging
 
 logger = logging.getLogger(__name__)
@@ -60,20 +74,76 @@ class RegisterView(CreateAPIView):
 
 
 # Список товаров
-class ProductsListView(ListAPIView):
+class ProductsListView(QueryBudgetMixin, CatalogCacheMixin, SparseQuerysetMixin, CompiledSerializerMixin, ListAPIView):
     """
     Вид для просмотра списка товаров.
-    Поддерживаются фильтры, поиск и сортировка.
+    Поддерживаются фильтры, поиск, сортировка и выбор полей параметрами fields и expand.
+    Товары отдаются страницами по курсору, ссылки на соседние страницы - в полях next и previous.
+    Число запросов к базе не зависит от количества товаров в ответе,
+    а повторные запросы до изменения каталога отдаются из кеша.
     """
     queryset = Product.objects.all()
+    query_budget = 4  # Пользователь, проверка категории в фильтре, страница товаров и фасеты
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    search_fields = ['name', 'category__name']
-    ordering_fields = ['price', 'created_at']
+    pagination_class = CatalogCursorPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, CatalogOrderingFilter]
+    filterset_class = ProductFilter
+    search_fields = ['name', 'category__name']  # Используются, если у СУБД нет полнотекстового индекса
+    ordering_fields = ['id', 'min_price', 'created_at']
+
+    def get_category_id(self):
+        try:
+            return int(self.request.query_params['category'])
+        except (KeyError, ValueError):
+            return None
+
+    def get_cache_scopes(self, request):
+        # Страница одной категории не зависит от изменений в других категориях
+        category_id = self.get_category_id()
+        return (LIST_SCOPE,) if category_id is None else (category_scope(category_id),)
+
+    def get_paginated_response(self, data):
+        # Счётчики фасетов берутся из материализованной таблицы, а не считаются по запросу
+        response = super().get_paginated_response(data)
+        response.data['facets'] = catalog_facets(self.get_category_id())
+        return response
+
+
+# Предложения магазинов по товарам
+class ProductOffersView(QueryBudgetMixin, CatalogCacheMixin, CompiledSerializerMixin, ListAPIView):
+    """
+    Вид для сравнения цен: предложения активных магазинов по одному товару (products/<id>/offers/)
+    или по нескольким (products/offers/?ids=1,2,3).
+    Предложения идут по товарам, а внутри товара - от дешёвых к дорогим.
+    """
+    query_budget = 2  # Пользователь и предложения
+    serializer_class = ProductOfferSerializer
+
+    def list(self, request, *args, **kwargs):
+        if 'pk' in kwargs:
+            self.product_ids = [kwargs['pk']]
+        else:
+            try:
+                self.product_ids = sorted({int(value) for value in request.query_params.get('ids', '').split(',')})
+            except ValueError:
+                return Response({'detail': 'Параметр ids должен содержать id товаров через запятую'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if len(self.product_ids) > settings.PRODUCT_OFFERS_MAX_IDS:
+                return Response({'detail': f'Не больше {settings.PRODUCT_OFFERS_MAX_IDS} товаров за запрос'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+    def get_cache_scopes(self, request):
+        return [product_scope(product_id) for product_id in self.product_ids]
+
+    def get_queryset(self):
+        # Неактивные магазины отсекаются по флагу предложения без соединения с магазином
+        return ProductInfo.objects.active().filter(product_id__in=self.product_ids) \
+            .order_by('product_id', 'price', 'id')
 
 
 # Просмотр корзины
-class CartView(RetrieveAPIView):
+class CartView(CompiledSerializerMixin, RetrieveAPIView):
     """
     Вид для отображения корзины текущего пользователя.
     Доступно только зарегистрированным пользователям.
@@ -100,7 +170,7 @@ class AddToCartView(CreateAPIView):
             product_id = item_data.get('product')
             quantity = item_data.get('quantity')
             try:
-                product = ProductInfo.objects.get(id=product_id)
+                product = ProductInfo.objects.active().get(id=product_id)
             except ProductInfo.DoesNotExist:
                 raise serializers.ValidationError(f"Товар с ID {product_id} не найден.")
             if product.quantity < quantity:
@@ -162,9 +232,13 @@ class PlaceOrderView(CreateAPIView):
 
     def perform_create(self, serializer):
         cart = Cart.get_cart(self.request.user)
-        total_amount = sum(item.product.price * item.quantity for item in cart.items.all())
+        cart_items = list(cart.items.select_related('product'))
+        unavailable = [str(item.product_id) for item in cart_items if not item.product.shop_active]
+        if unavailable:
+            raise serializers.ValidationError(f"Товары с ID {', '.join(unavailable)} сейчас недоступны для заказа.")
+        total_amount = sum(item.product.price * item.quantity for item in cart_items)
         order_items = []
-        for cart_item in cart.items.all():
+        for cart_item in cart_items:
             order_items.append(OrderItem(product=cart_item.product, quantity=cart_item.quantity))
         contact_data = self.request.data.get('contact', {})
         contact = Contact.objects.create(user=self.request.user, **contact_data)
@@ -179,33 +253,74 @@ class PlaceOrderView(CreateAPIView):
 
 
 # Получение списка заказов
-class OrdersListView(ListAPIView):
+class OrdersListView(SparseQuerysetMixin, CompiledSerializerMixin, ListAPIView):
     """
     Вид для отображения списка заказов пользователя.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
+    queryset = Order.objects.all()
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
 
 # Детали конкретного заказа
-class OrderDetailView(RetrieveAPIView):
+class OrderDetailView(SparseQuerysetMixin, RetrieveAPIView):
     """
     Вид для отображения деталей конкретного заказа.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
+    queryset = Order.objects.all()
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
+
+
+def start_import(file_obj, user):
+    """
+    Сохраняет загруженный прайс, регистрирует задачу импорта и ставит её в очередь.
+    """
+    started = time.monotonic()
+    upload = save_upload(file_obj)
+    job = ImportJob.objects.create(
+        user=user,
+        file_name=upload['name'] or '',
+        checksum=upload['checksum'],
+        timings={'upload': round(time.monotonic() - started, 3)},
+    )
+    task = async_import_products.delay(upload, user.id, job.id)
+    job.task_id = task.id
+    job.save(update_fields=['task_id'])
+    return job, task
+
+
+def start_export(export_format, kind):
+    """
+    Ставит экспорт в очередь. Одинаковые запросы, пришедшие до его завершения,
+    получают id уже запущенной задачи, а не запускают повторное чтение каталога.
+    """
+    lock_key = export_lock_key(export_format, kind)
+    task_id = str(uuid.uuid4())
+    if not cache.add(lock_key, task_id, settings.EXPORT_LOCK_TIMEOUT):
+        running = cache.get(lock_key)
+        if running:
+            return running
+        cache.set(lock_key, task_id, settings.EXPORT_LOCK_TIMEOUT)
+    try:
+        async_export_products.apply_async((export_format, kind), task_id=task_id)
+    except Exception:
+        cache.delete(lock_key)
+        raise
+    return task_id
 
 
 # Импорт товаров
 class ImportProductsView(CreateAPIView):
     """
     Вид для загрузки файла с информацией о товарах.
+    Поддерживаются форматы YAML, CSV, JSON Lines и XLSX.
     """
     parser_classes = [MultiPartParser]
     permission_classes = [IsAuthenticated]
@@ -213,20 +328,120 @@ class ImportProductsView(CreateAPIView):
     def post(self, request, format=None):
         file_obj = request.FILES.get("file")
         if file_obj:
-            raw_file_data = file_obj.read()
-            result = async_import_products.delay(raw_file_data, request.user.id)
-            return Response({'task_id': result.task_id}, status=status.HTTP_202_ACCEPTED)
+            job, result = start_import(file_obj, request.user)
+            return Response({'task_id': result.task_id, 'job_id': job.id}, status=status.HTTP_202_ACCEPTED)
         else:
             return Response({'detail': 'Нет файла для импорта'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Прогресс импорта
+class ImportJobDetailView(RetrieveAPIView):
+    """
+    Вид для отображения статуса и прогресса импорта прайса.
+    Доступен только пользователю, загрузившему файл.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImportJobSerializer
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
+
+
 class ExportProductsView(CreateAPIView):
     """
-    Вид для запуска асинхронного экспорта товаров (только в формате YAML)
+    Вид для запуска асинхронного экспорта товаров.
+    Формат задаётся параметром format: yaml (по умолчанию), csv.gz, jsonl или parquet.
+    Параметр kind=delta запрашивает только изменения с предыдущего экспорта.
     """
     def create(self, request):
-        task_result = async_export_products.delay()
-        return Response({'task_id': task_result.task_id}, status=status.HTTP_202_ACCEPTED)
+        export_format = request.data.get('format') or 'yaml'
+        if export_format not in EXPORT_FORMATS:
+            return Response({'detail': f'Неподдерживаемый формат. Доступны: {", ".join(EXPORT_FORMATS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        kind = request.data.get('kind') or 'full'
+        if kind not in dict(ProductExport.KIND_CHOICES):
+            return Response({'detail': 'Параметр kind принимает значения full или delta'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        task_id = start_export(export_format, kind)
+        return Response({'task_id': task_id, 'format': export_format, 'kind': kind},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+# Скачивание экспорта
+class ExportDownloadView(APIView):
+    """
+    Вид для скачивания сформированного файла экспорта.
+    Файл отдаётся потоково. Поддерживаются ETag/If-None-Match по контрольной сумме
+    и запрос одного диапазона байт (Range) для докачки.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        export = get_object_or_404(ProductExport, pk=pk)
+        path = export_path(export.filename)
+        if not os.path.exists(path):
+            raise Http404('Файл экспорта не найден')
+
+        etag = quote_etag(export.checksum)
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        size = os.path.getsize(path)
+        content_type, encoding = mimetypes.guess_type(export.filename)
+        content_type = {'gzip': 'application/gzip'}.get(encoding, content_type) or 'application/octet-stream'
+        byte_range = None
+        # If-Range: диапазон отдаётся, только если у клиента та же версия файла
+        if request.headers.get('If-Range', etag) == etag:
+            byte_range = parse_byte_range(request.headers.get('Range'), size)
+
+        if byte_range == 'unsatisfiable':
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(path, start, end - start + 1),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(open(path, 'rb'), as_attachment=True, filename=export.filename,
+                                    content_type=content_type)
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+
+def parse_byte_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+    Возвращает (start, end) включительно, None, если заголовок не задан, не поддерживается
+    или синтаксически неверен (такой заголовок игнорируется и отдаётся весь файл, RFC 9110),
+    и 'unsatisfiable', если диапазон лежит за пределами файла.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    if not (first or last) or not all(value.isdigit() for value in (first, last) if value):
+        return None
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and start > end:
+            return None
+    else:
+        # Суффиксный диапазон: последние N байт
+        if int(last) == 0:
+            return 'unsatisfiable'
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size:
+        return 'unsatisfiable'
+    return start, min(end, size - 1)
 
 
 # Изменение статуса заказа
@@ -286,8 +501,8 @@ class PartnerUpdate(CreateAPIView):
         file = request.FILES.get('file')
         if not file:
             return Response({'Status': False, 'Error': 'Файл не передан'}, status=status.HTTP_400_BAD_REQUEST)
-        task = async_import_products.delay(file.read(), request.user.id)
-        return Response({'task_id': task.id}, status=status.HTTP_202_ACCEPTED)
+        job, task = start_import(file, request.user)
+        return Response({'task_id': task.id, 'job_id': job.id}, status=status.HTTP_202_ACCEPTED)
 
 
 # Dосстановление пароля